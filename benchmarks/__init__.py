@@ -0,0 +1,10 @@
+"""Headless benchmarks of the scanning actions and the playlist
+
+    python -m benchmarks --profile quick
+    python -m benchmarks --profile quick --save-baseline
+
+The baseline stores the time of a fixed CPU workload next to the results,
+runs on other machines are compared after scaling by it. Regenerate
+``benchmarks/baseline.json`` with ``--save-baseline`` after an intended
+change in performance, on an idle machine.
+"""
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+
+from benchmarks import scenarios
+from benchmarks.scenarios import NOISE_FLOOR, NOISE_FLOORS, SCENARIOS, calibrate
+from benchmarks.synthetic import LibrarySpec, generate
+
+
+PROFILES = {
+    'quick': LibrarySpec(fanout=(6, 4), files=40, duplicates=20),
+    'medium': LibrarySpec(fanout=(8, 5, 5), files=25, duplicates=100),
+    'full': LibrarySpec(fanout=(10, 10, 10), files=100, duplicates=1000, sparse=4),
+}
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def run(profile, repeat, names):
+    results = dict()
+
+    with tempfile.TemporaryDirectory() as base:
+        manifest = generate(base, PROFILES[profile])
+
+        for name in names:
+            times = SCENARIOS[name](base, repeat)
+            results[name] = dict(min=min(times), mean=sum(times) / len(times), repeat=len(times))
+            print(f'{name:>20}: {min(times):.4f} s')
+
+    return dict(
+        profile=profile,
+        python=platform.python_version(),
+        videos=manifest['videos'],
+        calibration=calibrate(repeat),
+        results=results,
+    )
+
+
+def compare(current, baseline, tolerance, noise=None):
+    """Return the scenarios that got slower than ``tolerance`` times the baseline
+
+    The baseline is scaled by the calibration times so it can be compared
+    with a run on another machine, slowdowns under the noise floor of a scenario are ignored
+    """
+    noise = NOISE_FLOORS if noise is None else noise
+    scale = current.get('calibration', 1) / baseline.get('calibration', 1)
+    regressions = []
+
+    for name, result in current['results'].items():
+        reference = baseline['results'].get(name)
+
+        if reference is None:
+            continue
+
+        expected = reference['min'] * scale
+        ratio = result['min'] / expected
+        if ratio > tolerance and result['min'] - expected > noise.get(name, NOISE_FLOOR):
+            regressions.append((name, ratio))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the headless benchmarks')
+    parser.add_argument('--profile', default='quick', choices=list(PROFILES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help='Scenarios to run, all by default')
+    parser.add_argument('--output', default=None, help='Write the results to this JSON file')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=1.5, help='Fail when a scenario is this many times slower')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--search-documents', type=int, default=scenarios.SEARCH_DOCUMENTS, help='Size of the full text index')
+    args = parser.parse_args(argv)
+    scenarios.SEARCH_DOCUMENTS = args.search_documents
+
+    current = run(args.profile, args.repeat, args.scenario or list(SCENARIOS))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    if baseline['profile'] != current['profile']:
+        print(f'Baseline is for profile {baseline["profile"]}, not comparing')
+        return 0
+
+    regressions = compare(current, baseline, args.tolerance)
+    for name, ratio in regressions:
+        print(f'REGRESSION {name} is {ratio:.2f}x slower than the baseline')
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
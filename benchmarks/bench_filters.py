@@ -0,0 +1,47 @@
+"""Per entry cost of the scan filters
+
+    python benchmarks/bench_filters.py
+
+"""
+import random
+import timeit
+
+from player.filters import FileFilter
+
+
+EXTENSIONS = ['mkv', 'mp4', 'avi', 'MKV', 'srt', 'nfo', 'jpg', 'PNG', 'txt']
+
+
+def entries(count, seed=0):
+    rng = random.Random(seed)
+    names = []
+
+    for i in range(count):
+        folder = '/'.join(f'folder{rng.randrange(20)}' for _ in range(rng.randrange(1, 4)))
+        names.append((f'file{i}.{rng.choice(EXTENSIONS)}', f'{folder}/file{i}.{rng.choice(EXTENSIONS)}'))
+
+    return names
+
+
+def bench(name, file_filter, names, repeat=5):
+    def run():
+        accept = file_filter.accept
+        for file, rel in names:
+            accept(file, rel)
+
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    print(f'{name:>20}: {best / len(names) * 1e9:8.1f} ns/entry')
+    return best / len(names)
+
+
+def main(count=100000):
+    names = entries(count)
+
+    bench('extensions', FileFilter(), names)
+    bench('globs', FileFilter(ignore=['*sample*', 'extras/*', '*.part']), names)
+    bench('globs+regex', FileFilter(ignore=['*sample*', 'extras/*'], ignore_regex=[r'.*\btrailer\b']), names)
+    bench('include', FileFilter(include=['keep/*'], ignore=['*sample*']), names)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""Timed scenarios, none of them need Qt or VLC"""
+from contextlib import redirect_stdout
+import io
+import queue
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_filters import entries
+from player.actions import check_duplicates, open_folder
+from player.channel import BoundedChannel
+from player.filters import FileFilter, search
+from player.random_play import PlaylistAutoPlay
+from player.search import SearchIndex
+from player.session import Session, load, write
+from player.staging import StagingArea
+
+
+def timeit(fun, repeat, setup=None):
+    times = []
+
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+
+        start = time.perf_counter()
+        fun()
+        times.append(time.perf_counter() - start)
+
+    return times
+
+
+def calibrate(repeat):
+    """Time of a fixed CPU bound workload, the results are compared in multiples of it"""
+    rng = random.Random(0)
+    numbers = [rng.random() for _ in range(200000)]
+    return min(timeit(lambda: sorted(numbers), repeat))
+
+
+def scan_names(base):
+    results = queue.Queue()
+    open_folder.action(results, base)
+    return {m[1]: m[2] for m in results.queue if m[0] == open_folder.RESULT}
+
+
+def bench_open_folder(base, repeat):
+    return timeit(lambda: open_folder.action(queue.Queue(), base), repeat)
+
+
+def bench_check_duplicates(base, repeat):
+    def run():
+        with redirect_stdout(io.StringIO()):
+            check_duplicates.action(queue.Queue(), base)
+
+    # check_duplicates stages the copies it finds, put them back between runs
+    def restore():
+        StagingArea(base).undo(all=True)
+
+    times = timeit(run, repeat, setup=restore)
+    restore()
+    return times
+
+
+def bench_autoplay(base, repeat, size=50000):
+    names = {f'video {i:06d}.mkv': f'/videos/video {i:06d}.mkv' for i in range(size)}
+
+    def run():
+        random.seed(0)
+        auto = PlaylistAutoPlay(names)
+        auto.reset()
+
+        for _ in range(1000):
+            auto.next()
+
+        for _ in range(100):
+            auto.previous()
+
+        auto.set_selection_set([n for n in names if n.endswith('1.mkv')])
+        for _ in range(100):
+            auto.next()
+
+    return timeit(run, repeat)
+
+
+def bench_playlist_filter(base, repeat, size=50000):
+    names = [f'video {i:06d} the night.mkv' for i in range(size)]
+
+    def run():
+        for text in ('n', 'ni', 'nig', 'nigh', 'night', '0001', ''):
+            search(text, names)
+
+    return timeit(run, repeat)
+
+
+def bench_file_filter(base, repeat, size=100000):
+    names = entries(size)
+    file_filter = FileFilter(ignore=['*sample*', 'extras/*'])
+
+    def run():
+        accept = file_filter.accept
+        for file, rel in names:
+            accept(file, rel)
+
+    return timeit(run, repeat)
+
+
+def bench_session(base, repeat, size=100000):
+    items = [(f'video {i:06d}.mkv', f'/videos/folder {i % 100}/video {i:06d}.mkv') for i in range(size)]
+    session = Session(items=items, remains=[name for name, _ in items])
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'session.bin')
+
+        def run():
+            write(path, session)
+            load(path)
+
+        return timeit(run, repeat)
+
+
+def bench_channel(base, repeat, size=200000):
+    """Scan results through the bounded channel to a consumer slower than the producer"""
+    def run():
+        channel = BoundedChannel(max_bytes=1024 ** 2, coalesce={open_folder.RESULT: open_folder.BATCH})
+
+        def scan():
+            for i in range(size):
+                channel.put((open_folder.RESULT, f'video {i:07d}.mkv', f'/videos/video {i:07d}.mkv'))
+            channel.put((open_folder.END,))
+
+        producer = threading.Thread(target=scan)
+        producer.start()
+
+        while channel.get()[0] != open_folder.END:
+            pass
+
+        producer.join()
+
+    return timeit(run, repeat)
+
+
+# Documents in the full text index, set with --search-documents
+SEARCH_DOCUMENTS = 1000000
+TITLES = ['night of the living dead', 'dead calm', 'nightcrawler', 'the big lebowski', 'summer of 69']
+
+
+def bench_search(base, repeat, size=None):
+    """Query latency of the full text index, building the index is not timed"""
+    size = size or SEARCH_DOCUMENTS
+    index = SearchIndex()
+    index.add_many(
+        (f'video {i:07d} {TITLES[i % len(TITLES)]}.mkv', f'/videos/folder {i % 1000}/video {i:07d} {TITLES[i % len(TITLES)]}.mkv')
+        for i in range(size)
+    )
+
+    def run():
+        for text in ('ni', 'night', '"night of"', 'folders:12 vid', '0001234', 'lebowski'):
+            index.query(text, limit=100)
+
+    times = timeit(run, repeat)
+    index.close()
+    return times
+
+
+def bench_cli_cold_start(base, repeat):
+    return timeit(lambda: subprocess.run([sys.executable, '-m', 'player.cli', 'list'], check=True, capture_output=True), repeat)
+
+
+# Differences smaller than this (seconds) are noise, even when they are a large ratio
+NOISE_FLOOR = 0.01
+
+NOISE_FLOORS = {
+    'open_folder': 0.02,
+    'cli_cold_start': 0.1,
+}
+
+SCENARIOS = {
+    'open_folder': bench_open_folder,
+    'check_duplicates': bench_check_duplicates,
+    'autoplay': bench_autoplay,
+    'playlist_filter': bench_playlist_filter,
+    'file_filter': bench_file_filter,
+    'session': bench_session,
+    'channel': bench_channel,
+    'search': bench_search,
+    'cli_cold_start': bench_cli_cold_start,
+}
@@ -0,0 +1,138 @@
+"""Reproducible synthetic video libraries"""
+import json
+import os
+import random
+
+
+WORDS = [
+    'the', 'night', 'city', 'river', 'blue', 'last', 'house', 'man', 'war', 'love',
+    'star', 'dark', 'road', 'king', 'island', 'winter', 'ghost', 'dream', 'fire', 'sea',
+    'moon', 'empire', 'storm', 'garden', 'shadow', 'mountain', 'stranger', 'ocean', 'silent', 'golden',
+]
+
+VIDEO_EXTENSIONS = ['mkv', 'mp4', 'avi', 'MKV', 'mov']
+OTHER_EXTENSIONS = ['srt', 'nfo', 'jpg', 'txt']
+
+
+def zipf_word(rng, words=WORDS):
+    """Common words are picked much more often, like in real titles"""
+    weights = [1 / (i + 1) for i in range(len(words))]
+    return rng.choices(words, weights)[0]
+
+
+def make_name(rng, index):
+    words = [zipf_word(rng) for _ in range(rng.randint(1, 5))]
+    return f'{" ".join(words)} {index:06d}'
+
+
+def random_content(rng, size):
+    return rng.getrandbits(8 * size).to_bytes(size, 'little')
+
+
+class LibrarySpec:
+    """Shape of a synthetic library
+
+    Parameters
+    ----------
+    fanout: list[int]
+        number of sub folders per level, ``[4, 3]`` creates 4 folders with 3 sub folders each
+
+    files: int
+        number of video files per leaf folder
+
+    other: float
+        fraction of extra non video files (subtitles, covers)
+
+    size: int
+        size of the video files in bytes
+
+    sparse: int
+        number of sparse files
+
+    sparse_size: int
+        apparent size of the sparse files
+
+    duplicates: int
+        number of planted identical copies
+    """
+
+    def __init__(self, fanout=(4, 3), files=20, other=0.2, size=4096, sparse=0, sparse_size=2 * 1024 ** 3, duplicates=10, seed=0):
+        self.fanout = list(fanout)
+        self.files = files
+        self.other = other
+        self.size = size
+        self.sparse = sparse
+        self.sparse_size = sparse_size
+        self.duplicates = duplicates
+        self.seed = seed
+
+    def to_json(self):
+        return dict(vars(self))
+
+
+def leaf_folders(base, fanout, rng):
+    folders = [base]
+
+    for count in fanout:
+        folders = [
+            os.path.join(folder, zipf_word(rng) + f' {i}')
+            for folder in folders for i in range(count)
+        ]
+
+    return folders
+
+
+def write(path, content):
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def generate(base, spec):
+    """Create the library, returns a manifest describing what was planted"""
+    rng = random.Random(spec.seed)
+    videos = []
+    others = []
+    index = 0
+
+    for folder in leaf_folders(base, spec.fanout, rng):
+        os.makedirs(folder, exist_ok=True)
+
+        for _ in range(spec.files):
+            name = make_name(rng, index)
+            index += 1
+
+            path = os.path.join(folder, f'{name}.{rng.choice(VIDEO_EXTENSIONS)}')
+            write(path, random_content(rng, spec.size))
+            videos.append(path)
+
+            if rng.random() < spec.other:
+                path = os.path.join(folder, f'{name}.{rng.choice(OTHER_EXTENSIONS)}')
+                write(path, random_content(rng, 64))
+                others.append(path)
+
+    # Duplicates are planted from the regular videos, the sparse ones are too big to copy
+    regular = list(videos)
+
+    for i in range(spec.sparse):
+        path = os.path.join(base, f'sparse {i}.mkv')
+        with open(path, 'wb') as f:
+            f.write(random_content(rng, 4096))
+            f.truncate(spec.sparse_size)
+        videos.append(path)
+
+    duplicates = []
+    for i in range(min(spec.duplicates, len(regular))):
+        original = rng.choice(regular)
+        copy = os.path.join(os.path.dirname(rng.choice(videos)), f'copy {i}.mkv')
+
+        with open(original, 'rb') as f:
+            write(copy, f.read())
+
+        duplicates.append((original, copy))
+
+    manifest = dict(spec=spec.to_json(), videos=len(videos), others=len(others), duplicates=duplicates)
+
+    with open(os.path.join(base, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+
+    return manifest
@@ -1,7 +1,22 @@
 from collections import defaultdict
 import os
 import hashlib
-from pathlib import Path
+
+from player.devices import DeviceScheduler, as_roots, device_of, usable_roots
+from player.filters import default_filter
+from player.metrics import metrics
+from player.staging import StagingArea
+
+
+NAMESPACE = 'DUPLICATES'
+START = f'{NAMESPACE}_START'
+RESULT = f'{NAMESPACE}_GROUP'
+END = f'{NAMESPACE}_END'
+
+# Kind of duplicates reported in RESULT messages
+IDENTICAL = 'identical'
+SAME_NAME = 'filename'
+SIMILAR = 'similar'
 
 
 def compute_hash(hash, name):
@@ -12,45 +27,39 @@ def compute_hash(hash, name):
     return hash.hexdigest()
 
 
-def delete(base, file):
-    deleted = os.path.join(base, 'deleted')
-    os.makedirs(deleted, exist_ok=True)
-
-    dest = os.path.join(deleted, Path(file).name)
-    os.rename(file, dest)
-
-
-def action(queue, base):
-    """Check for identical files"""
-
-    print('Checking for duplicates')
+def sample_hash(name, samples=4, size=65536):
+    """Cheap content key: hash the file size and a few evenly spaced chunks.
 
-    filenames = defaultdict(list)
-    found = defaultdict(list)
-    processed_count = 0
+    Much faster than :func:`compute_hash` on large videos, and stable
+    across renames/moves since it only depends on the content.
+    """
+    hash = hashlib.sha1()
+    total = os.path.getsize(name)
+    hash.update(str(total).encode())
 
-    for root, dirs, files in os.walk(base):
+    with open(name, 'rb') as f:
+        if total <= samples * size:
+            hash.update(f.read())
+        else:
+            step = (total - size) // max(samples - 1, 1)
+            for i in range(samples):
+                f.seek(i * step)
+                hash.update(f.read(size))
 
-        for file in files:
-            path = os.path.join(root, file)
-            hash = compute_hash(hashlib.md5(), path)
+    return hash.hexdigest()
 
-            if hash in found:
-                print(f'Removed {path}')
-                delete(base, path)
 
-            found[hash].append(path)
-            filenames[file].append(path)
+def delete(base, *files):
+    """Stage the delete of the files, keeping their path relative to base"""
+    return StagingArea(base).stage(files)
 
-            processed_count += 1
 
-            if processed_count % 100 == 0:
-                print(f'Processed {processed_count} files')
+def report(queue, title, kind, groups):
+    """Print groups of duplicated files and push them as ``(RESULT, kind, key, files)``"""
+    print(title)
+    print('-' * len(title))
 
-    #
-    print('Files are identical')
-    print('-------------------')
-    for k, v in found.items():
+    for k, v in groups.items():
         if len(v) == 1:
             continue
 
@@ -58,13 +67,61 @@ def action(queue, base):
         for file in v:
             print(f'    - {file}')
 
-    print('Filename are duplicates')
-    print('-----------------------')
-    for k, v in filenames.items():
-        if len(v) == 1:
-            continue
+        queue.put((RESULT, kind, k, list(v)))
 
-        print(f'{k}:')
-        for file in v:
-            print(f'    - {file}')
 
+def list_files(roots, file_filter, scheduler):
+    """List the files of every root, returns ``(root, file, path)`` sorted by path"""
+    def listing(root):
+        return [(root, file, path) for _, file, path in file_filter.walk(root)]
+
+    devices = {root: device_of(root) for root in usable_roots(roots)}
+    entries = [e for found in scheduler.map(listing, list(devices), devices.get) for e in found]
+    entries.sort(key=lambda e: e[2])
+    return entries, devices
+
+
+@metrics.timed('action.check_duplicates')
+def action(queue, base, file_filter=default_filter, per_device=1):
+    """Check for identical files, in one or more folders"""
+
+    print('Checking for duplicates')
+    queue.put((START,))
+
+    scheduler = DeviceScheduler(per_device)
+    entries, devices = list_files(as_roots(base), file_filter, scheduler)
+
+    def hash_file(entry):
+        with metrics.span('check_duplicates.hash'):
+            return entry[2], compute_hash(hashlib.md5(), entry[2])
+
+    hashes = dict()
+    for path, hash in scheduler.map(hash_file, entries, lambda e: devices[e[0]]):
+        hashes[path] = hash
+
+        if len(hashes) % 100 == 0:
+            print(f'Processed {len(hashes)} files')
+
+    filenames = defaultdict(list)
+    found = defaultdict(list)
+    removed = defaultdict(list)
+
+    for root, file, path in entries:
+        hash = hashes[path]
+
+        if hash in found:
+            print(f'Removed {path}')
+            removed[root].append(path)
+
+        found[hash].append(path)
+        filenames[file].append(path)
+
+    metrics.inc('check_duplicates.files', len(entries))
+    metrics.inc('check_duplicates.removed', sum(len(v) for v in removed.values()))
+
+    for root, paths in removed.items():
+        delete(root, *paths)
+
+    report(queue, 'Files are identical', IDENTICAL, found)
+    report(queue, 'Filename are duplicates', SAME_NAME, filenames)
+    queue.put((END,))
@@ -1,18 +1,11 @@
-import os
-from pathlib import Path
+from player.metrics import metrics
+from player.staging import STAGED, StagingArea
 
-from player.actions.normalize_file_structure import get_parents
 
-
-
-
-def action(queue, base, path):
-    """This is not a real delete, it is going to stage the delete by moving the file to
-    a deleted folder.
+@metrics.timed('action.delete')
+def action(queue, base, *paths):
+    """This is not a real delete, it is going to stage the delete by moving the files to
+    a deleted folder, keeping their path relative to the base folder.
     """
-
-    deleted = os.path.join(base, 'deleted')
-    os.makedirs(deleted, exist_ok=True)
-
-    # Get how faraway from the base folder we are
-    parents = get_parents(base, path)
+    batch, moves = StagingArea(base).stage(paths)
+    queue.put((STAGED, batch, moves))
@@ -0,0 +1,47 @@
+import queue as queues
+import threading
+
+from player.actions import open_folder
+from player.metrics import metrics
+import player.playlists as playlists
+
+
+NAMESPACE = 'EXPORT'
+RESULT = f'{NAMESPACE}_RESULT'
+
+
+@metrics.timed('action.export_playlist')
+def action(queue, folder, output, per_device=1):
+    """Scan folders and write the videos to a playlist file (m3u, m3u8, jsonl) as they are found"""
+    found = queues.Queue(maxsize=10000)
+
+    errors = []
+
+    def scan():
+        try:
+            open_folder.action(found, folder, per_device=per_device)
+        except Exception as error:
+            # the playlist is written with what was found, the error is raised after
+            errors.append(error)
+            found.put((open_folder.END,))
+
+    thread = threading.Thread(target=scan, daemon=True)
+    thread.start()
+
+    def entries():
+        while True:
+            message = found.get()
+
+            if message[0] == open_folder.RESULT:
+                yield message[1:]
+
+            elif message[0] == open_folder.END:
+                return
+
+    count = playlists.write(output, entries())
+    thread.join()
+
+    if errors:
+        raise errors[0]
+
+    queue.put((RESULT, output, count))
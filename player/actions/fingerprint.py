@@ -0,0 +1,189 @@
+"""Find near duplicate videos from content-defined chunks of their bytes
+
+The fingerprints are computed on the raw file bytes, not on the decoded frames,
+so they find byte identical files, partial copies, remuxes and files whose
+container or tags changed. A re-encode changes all the bytes of the streams and
+is not found, that would need a signature of the decoded frames.
+"""
+from collections import defaultdict
+import hashlib
+import os
+import re
+
+from player.actions.check_duplicates import END, SIMILAR, START, list_files, report
+from player.devices import DeviceScheduler, as_roots
+from player.filters import default_filter
+from player.metrics import metrics
+
+
+# Chunk boundaries are placed where the content matches this pattern,
+# (~1 in 4096 positions on compressed data) so an insertion or a different
+# container header only changes the chunks around it, not all the following ones.
+BOUNDARY = re.compile(b'\x00[\x00-\x0f]')
+MIN_CHUNK = 64
+
+
+def chunk_hashes(data):
+    """Hash the content-defined chunks of a buffer.
+
+    The first and last chunks depend on where the buffer was cut, they are dropped.
+    """
+    chunks = BOUNDARY.split(data)[1:-1]
+
+    return {
+        int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), 'little')
+        for chunk in chunks if len(chunk) >= MIN_CHUNK
+    }
+
+
+def sampled_chunks(path, windows=8, window_size=128 * 1024):
+    """Read a few evenly spaced windows of a file and return its chunk hashes"""
+    total = os.path.getsize(path)
+    hashes = set()
+
+    with open(path, 'rb') as f:
+        if total <= windows * window_size:
+            return chunk_hashes(f.read())
+
+        step = (total - window_size) // max(windows - 1, 1)
+        for i in range(windows):
+            f.seek(i * step)
+            hashes |= chunk_hashes(f.read(window_size))
+
+    return hashes
+
+
+def minhash(hashes, size=64):
+    """One permutation MinHash: keep the smallest hash falling in each bin.
+
+    Bins that received no hash are None, they never match.
+    """
+    signature = [None] * size
+
+    for h in hashes:
+        i = h % size
+        v = h // size
+
+        if signature[i] is None or v < signature[i]:
+            signature[i] = v
+
+    return signature
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    same = sum(1 for x, y in zip(a, b) if x is not None and x == y)
+    return same / len(a)
+
+
+class LSHIndex:
+    """Index MinHash signatures by bands so only similar files are compared.
+
+    Two files become candidates when all the rows of at least one band match,
+    which makes finding near duplicates roughly linear in the number of files.
+
+    Parameters
+    ----------
+    bands: int
+        number of bands, more bands finds less similar files
+
+    rows: int
+        values per band, more rows makes buckets more selective
+
+    max_bucket: int
+        buckets larger than this are ignored (degenerate content like padding)
+    """
+
+    def __init__(self, bands=16, rows=4, max_bucket=1000):
+        self.bands = bands
+        self.rows = rows
+        self.max_bucket = max_bucket
+        self.signatures = dict()
+        self.buckets = defaultdict(list)
+
+    @property
+    def size(self):
+        return self.bands * self.rows
+
+    def add(self, key, signature):
+        self.signatures[key] = signature
+
+        for band in range(self.bands):
+            values = tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+            if None in values:
+                continue
+
+            self.buckets[(band, values)].append(key)
+
+    def candidates(self):
+        """Yield the unique pairs of keys sharing at least one bucket"""
+        seen = set()
+
+        for keys in self.buckets.values():
+            if len(keys) < 2 or len(keys) > self.max_bucket:
+                continue
+
+            for i, a in enumerate(keys):
+                for b in keys[i + 1:]:
+                    pair = (a, b) if a < b else (b, a)
+
+                    if pair not in seen:
+                        seen.add(pair)
+                        yield pair
+
+    def groups(self, threshold=0.5):
+        """Group keys whose estimated similarity is above the threshold"""
+        parent = dict()
+
+        def find(k):
+            while parent.get(k, k) != k:
+                k = parent[k]
+            return k
+
+        for a, b in self.candidates():
+            if similarity(self.signatures[a], self.signatures[b]) < threshold:
+                continue
+
+            ra, rb = find(a), find(b)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+
+        groups = defaultdict(list)
+        for k in parent:
+            groups[find(k)].append(k)
+
+        for root, keys in groups.items():
+            keys.append(root)
+            keys.sort()
+
+        return groups
+
+
+@metrics.timed('action.fingerprint')
+def action(queue, base, threshold=0.5, bands=16, rows=4, file_filter=default_filter, per_device=1):
+    """Check for files with mostly the same content (remux, re-encode)"""
+
+    print('Checking for similar files')
+    queue.put((START,))
+
+    index = LSHIndex(bands, rows)
+    processed_count = 0
+
+    scheduler = DeviceScheduler(per_device)
+    entries, devices = list_files(as_roots(base), file_filter, scheduler)
+
+    def signature(entry):
+        with metrics.span('fingerprint.file'):
+            return entry[2], minhash(sampled_chunks(entry[2]), index.size)
+
+    for path, sig in scheduler.map(signature, entries, lambda e: devices[e[0]]):
+        index.add(path, sig)
+        processed_count += 1
+
+        if processed_count % 100 == 0:
+            print(f'Processed {processed_count} files')
+
+    metrics.inc('fingerprint.files', processed_count)
+    report(queue, 'Files are similar', SIMILAR, index.groups(threshold))
+    queue.put((END,))
@@ -0,0 +1,17 @@
+from player.devices import as_roots
+from player.filters import default_filter
+from player.metrics import metrics
+from player.thumbnails import ERROR, RESULT, ThumbnailGenerator
+
+
+@metrics.timed('action.generate_thumbnails')
+def action(queue, base, frames=1, width=160, file_filter=default_filter):
+    """Generate the thumbnails of every video inside a folder"""
+    generator = ThumbnailGenerator(queue, frames=frames, width=width)
+
+    for root in as_roots(base):
+        for _, file, path in file_filter.walk(root):
+            try:
+                queue.put((RESULT, path, generator.generate(path)))
+            except Exception as err:
+                queue.put((ERROR, path, str(err)))
@@ -0,0 +1,54 @@
+from player.actions.open_folder import BATCH, END, START
+from player.devices import as_roots
+from player.metrics import metrics
+import player.playlists as playlists
+
+
+def unique_names(batch, names, paths):
+    """Name the entries so two files never share a name, like open_folder does
+
+    A file whose name is taken by another file is named by its path, a file
+    listed several times keeps its first name. ``names`` (path to name) and
+    ``paths`` (name to path) hold the names already sent, they are updated
+    """
+    entries = []
+
+    for name, path in batch:
+        name = names.get(path, name)
+
+        if paths.setdefault(name, path) != path:
+            name = path
+            paths[name] = path
+
+        names[path] = name
+        entries.append((name, path))
+
+    return entries
+
+
+@metrics.timed('action.import_playlist')
+def action(queue, files, batch_size=1000):
+    """Load one or more playlist files (m3u, m3u8, jsonl), entries are sent in batches as they are parsed"""
+    queue.put((START,))
+
+    # END is always sent, the player waits for it
+    try:
+        _import(queue, as_roots(files), batch_size)
+    finally:
+        queue.put((END,))
+
+
+def _import(queue, files, batch_size):
+    names, paths = dict(), dict()
+    count = 0
+
+    for file in files:
+        try:
+            for batch in playlists.read(file, batch_size):
+                queue.put((BATCH, unique_names(batch, names, paths)))
+                count += len(batch)
+
+        except OSError as err:
+            print(f'Skipping playlist {file}: {err}')
+
+    metrics.inc('import_playlist.entries', count)
@@ -1,26 +1,225 @@
 from collections import defaultdict
+from multiprocessing.dummy import Pool
 from pathlib import Path
+import json
 import os
+import shutil
+import threading
+
+from player.filters import FileFilter
+import player.journal as journal
+from player.metrics import metrics
+from player.staging import move
+
+
+NAMESPACE = 'NORMALIZE'
+START = f'{NAMESPACE}_START'
+RESULT = f'{NAMESPACE}_BATCH'
+END = f'{NAMESPACE}_END'
+
+STATE = '.normalize'
+
+# Subtitles and covers move with their video, only the player folders are skipped
+move_filter = FileFilter(extensions=())
 
 
 def get_parents(base, path):
     parents = []
     current_path = Path(path).parent.absolute()
 
-    while current_path != Path(base):
-        depth += 1
+    while current_path != Path(base).absolute():
         parents.append(current_path.name)
         current_path = current_path.parent.absolute()
 
     return list(reversed(parents))
 
 
-def action(queue, base):
-    """"""
+def top_folder(base, path):
+    """Keep the first level folders, flatten everything below them"""
+    parents = get_parents(base, path)
+    return os.path.join(base, *parents[:1], os.path.basename(path))
+
+
+def flatten(base, path):
+    """Move every file to the base folder"""
+    return os.path.join(base, os.path.basename(path))
+
+
+LAYOUTS = {
+    'top_folder': top_folder,
+    'flatten': flatten,
+}
+
+
+def scan(base):
+    """List all the files that can be moved"""
+    return [path for _, _, path in move_filter.walk(base)]
+
+
+def resolve_collision(dest, taken):
+    """Add a counter to the file name until it does not collide"""
+    stem, ext = os.path.splitext(dest)
+    count = 1
+
+    while dest in taken:
+        dest = f'{stem} ({count}){ext}'
+        count += 1
+
+    return dest
+
+
+class OnDisk:
+    """Paths that exist on disk or that are reserved by a move in progress"""
+
+    def __init__(self, reserved):
+        self.reserved = reserved
+
+    def __contains__(self, path):
+        return path in self.reserved or os.path.lexists(path)
+
+
+def make_plan(base, paths, layout=top_folder):
+    """Compute the moves needed to normalize the folder, no file is touched.
+
+    Moves are grouped by source folder, each group is executed as one batch.
+    """
+    targets = [(path, layout(base, path)) for path in paths]
+    moving = [(src, dst) for src, dst in targets if src != dst]
+
+    # Files that stay where they are keep their name
+    taken = {src for src, dst in targets if src == dst}
+    batches = defaultdict(list)
+
+    for src, dst in sorted(moving):
+        dst = resolve_collision(dst, taken)
+        taken.add(dst)
+        batches[os.path.dirname(src)].append([src, dst])
+
+    return [
+        dict(id=i, folder=folder, moves=moves)
+        for i, (folder, moves) in enumerate(sorted(batches.items()))
+    ]
+
+
+class Executor:
+    """Execute a plan with a pool of workers, checkpointing every finished batch.
+
+    The plan and the checkpoint are saved inside ``base/.normalize`` so an
+    interrupted run resumes where it stopped instead of planning again.
+    """
+
+    def __init__(self, base, workers=4):
+        self.base = base
+        self.workers = workers
+        self.folder = os.path.join(base, STATE)
+        self.plan_file = os.path.join(self.folder, 'plan.json')
+        self.checkpoint = os.path.join(self.folder, 'checkpoint.jsonl')
+        self.lock = threading.Lock()
+        self.reserved = set()
+
+    def load(self):
+        """Return the pending plan if a previous run was interrupted"""
+        if not os.path.exists(self.plan_file):
+            return None
+
+        with open(self.plan_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, plan):
+        os.makedirs(self.folder, exist_ok=True)
+
+        tmp = self.plan_file + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(plan, f)
+        os.replace(tmp, self.plan_file)
+
+    def done(self):
+        return {record['batch'] for record in journal.read(self.checkpoint)}
+
+    def reserve(self, dst):
+        """Destination that does not overwrite anything, the plan can be older than the folder"""
+        with self.lock:
+            free = resolve_collision(dst, OnDisk(self.reserved))
+            self.reserved.add(free)
+            return free
+
+    @metrics.timed('normalize.batch')
+    def execute_batch(self, batch):
+        moved = 0
+
+        for item in batch['moves']:
+            src, dst = item
+
+            # Already moved by the interrupted run, or gone
+            if not os.path.exists(src):
+                continue
+
+            free = self.reserve(dst)
+            if free != dst:
+                print(f'{dst} already exists, moving {src} to {free}')
+                item[1] = free
+
+            try:
+                move(src, free)
+                moved += 1
+            except OSError as err:
+                print(f'Could not move {src}: {err}')
+            finally:
+                with self.lock:
+                    self.reserved.discard(free)
+
+        metrics.inc('normalize.moved', moved)
+
+        with self.lock:
+            journal.append(self.checkpoint, [dict(batch=batch['id'], moved=moved)])
+
+        return batch, moved
+
+    def run(self, plan, callback=None):
+        """Execute the batches that are not done yet"""
+        self.save(plan)
+        done = self.done()
+        todo = [batch for batch in plan if batch['id'] not in done]
+
+        with Pool(self.workers) as pool:
+            for batch, moved in pool.imap_unordered(self.execute_batch, todo):
+                if callback is not None:
+                    callback(batch, moved)
+
+        self.cleanup(plan)
+
+    def cleanup(self, plan):
+        """Remove the run state and the folders left empty by the moves"""
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+        folders = sorted({batch['folder'] for batch in plan}, key=len, reverse=True)
+        for folder in folders:
+            while folder != self.base and folder.startswith(self.base):
+                try:
+                    os.rmdir(folder)
+                except OSError:
+                    break
+                folder = os.path.dirname(folder)
+
+
+@metrics.timed('action.normalize_file_structure')
+def action(queue, base, layout='top_folder', workers=4, dry_run=False):
+    """Move the files of a folder to a normalized layout"""
+    base = os.path.abspath(base)
+    executor = Executor(base, workers)
 
-    for root, dirs, files in os.walk(base):
+    plan = executor.load()
+    if plan is None:
+        plan = make_plan(base, scan(base), LAYOUTS[layout])
+    else:
+        print('Resuming interrupted run')
 
-        for file in files:
-            pass
+    queue.put((START, len(plan), sum(len(batch['moves']) for batch in plan)))
 
+    if dry_run:
+        for batch in plan:
+            queue.put((RESULT, batch['folder'], batch['moves']))
+    else:
+        executor.run(plan, lambda batch, moved: queue.put((RESULT, batch['folder'], batch['moves'])))
 
+    queue.put((END,))
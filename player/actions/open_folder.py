@@ -1,52 +1,67 @@
 from collections import defaultdict
 import os
+import threading
 
-
-IGNORE_FILE_EXTENSIONS = (
-    'nfo', 'txt', 'exe' ,'pdf', 'gif', 'css', 'js', 'html', 'srt',
-
-    #
-    'png', 'jpg', 'jpeg', 'webm'
-    #
-)
+from player.devices import DeviceScheduler, device_of, usable_roots
+from player.filters import IGNORE_FILE_EXTENSIONS, FileFilter, default_filter
+from player.metrics import metrics
 
 NAMESPACE = 'FOLDER'
 START = f'{NAMESPACE}_START'
 RESULT = f'{NAMESPACE}_ITEM'
+BATCH = f'{NAMESPACE}_BATCH'
 END = f'{NAMESPACE}_END'
 
 
-def action(queue, folder, ignored_extensions=None):
+@metrics.timed('action.open_folder')
+def action(queue, folder, ignored_extensions=None, file_filter=None, per_device=1):
+    """List the videos of one or more folders, folders on different disks are scanned in parallel"""
     queue.put((START,))
 
-    if ignored_extensions is None:
-        ignored_extensions = IGNORE_FILE_EXTENSIONS
+    # END is always sent, the player and the exports wait for it
+    try:
+        _scan(queue, folder, ignored_extensions, file_filter, per_device)
+    finally:
+        queue.put((END,))
+
+
+def _scan(queue, folder, ignored_extensions, file_filter, per_device):
+    if file_filter is None:
+        if ignored_extensions is None:
+            file_filter = default_filter
+        else:
+            file_filter = FileFilter(ignored_extensions)
 
     duplicates = defaultdict(set)
     names = dict()
+    lock = threading.Lock()
 
-    for root, dirs, files in os.walk(folder):
+    def scan(root):
+        for _, file, f in file_filter.walk(root):
+            name = file
 
-        for file in files:
-            ext = file.rsplit('.', maxsplit=1)[-1]
+            with lock:
+                if file in names and f != names[file]:
+                    original = names[file]
+                    duplicates[file].add(original)
+                    duplicates[file].add(f)
 
-            if ext in IGNORE_FILE_EXTENSIONS:
-                continue
+                    # Same name in another folder, show it with its relative path
+                    name = os.path.relpath(f, root).replace(os.sep, '/')
+                    if name in names:
+                        name = f
 
-            f = os.path.join(root, file)
+                names[name] = f
 
-            if file in names and f != names[file]:
-                original = names[file]
-                duplicates[file].add(original)
-                duplicates[file].add(f)
-                continue
+            queue.put((RESULT, name, f))
 
-            names[file] = f
-            queue.put((RESULT, file, f))
+    for _ in DeviceScheduler(per_device).map(scan, usable_roots(folder), device_of):
+        pass
 
     # for k, v in duplicates.items():
     #     print(k)
     #     for item in v:
     #         print(f'    - {item}')
 
-    queue.put((END,))
+    metrics.inc('open_folder.files', len(names))
+    metrics.inc('open_folder.duplicate_names', len(duplicates))
@@ -0,0 +1,12 @@
+from player.metrics import metrics
+from player.staging import StagingArea
+
+
+NAMESPACE = 'PURGE'
+RESULT = f'{NAMESPACE}_RESULT'
+
+
+@metrics.timed('action.purge_deleted')
+def action(queue, base, batch=None, all=True):
+    """Permanently remove staged deletes (all of them by default)"""
+    queue.put((RESULT, StagingArea(base).purge(batch, all=all)))
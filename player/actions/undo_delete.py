@@ -0,0 +1,8 @@
+from player.metrics import metrics
+from player.staging import RESTORED, StagingArea
+
+
+@metrics.timed('action.undo_delete')
+def action(queue, base, batch=None, all=False):
+    """Restore the files of a staged delete (the last one by default)"""
+    queue.put((RESTORED, batch, StagingArea(base).undo(batch, all=all)))
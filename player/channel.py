@@ -0,0 +1,170 @@
+"""Bounded message channel between the actions and the UI
+
+Producers block when the messages waiting for the consumer go over a byte
+budget, so a fast scan cannot build an unbounded backlog while the UI drains
+it a few milliseconds per tick. Item messages can be coalesced into batch
+messages while the consumer is behind.
+
+>>> channel = BoundedChannel(coalesce={'ITEM': 'BATCH'})
+>>> channel.put(('ITEM', 'a.mkv', '/videos/a.mkv'))
+True
+>>> channel.put(('ITEM', 'b.mkv', '/videos/b.mkv'))
+True
+>>> channel.get(block=False)
+('BATCH', [('a.mkv', '/videos/a.mkv'), ('b.mkv', '/videos/b.mkv')])
+"""
+from collections import deque
+from queue import Empty, Full
+import threading
+import time
+
+from player.metrics import metrics
+
+
+OVERHEAD = 64
+
+
+def message_size(message):
+    """Rough size in bytes of a message, strings and bytes are counted by length"""
+    if isinstance(message, (str, bytes)):
+        return OVERHEAD + len(message)
+
+    if isinstance(message, (tuple, list, set)):
+        return OVERHEAD + sum(message_size(m) for m in message)
+
+    if isinstance(message, dict):
+        return OVERHEAD + sum(message_size(k) + message_size(v) for k, v in message.items())
+
+    return OVERHEAD
+
+
+class BoundedChannel:
+    """Thread safe FIFO with a byte budget, same ``put`` / ``get`` interface as :class:`queue.Queue`
+
+    Parameters
+    ----------
+    max_bytes: int
+        producers block while the waiting messages use more than this,
+        a single message bigger than the budget is accepted when the channel is empty
+
+    coalesce: dict
+        message type of an item to the message type of a batch of items,
+        ``(ITEM, *args)`` messages are appended to a waiting ``(BATCH, [args])`` message
+
+    max_batch: int
+        maximum number of items in a coalesced batch
+    """
+
+    def __init__(self, max_bytes=8 * 1024 ** 2, coalesce=None, max_batch=1000):
+        self.max_bytes = max_bytes
+        self.coalesce = coalesce or dict()
+        self.max_batch = max_batch
+        self.messages = deque()
+        self.sizes = deque()
+        self.nbytes = 0
+        self.peak_bytes = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        self.not_full = threading.Condition(self.lock)
+        self.not_empty = threading.Condition(self.lock)
+        # batch message created by coalescing that the consumer has not taken yet
+        self._batch = None
+
+    def qsize(self):
+        return len(self.messages)
+
+    def empty(self):
+        return not self.messages
+
+    def close(self):
+        """Wake up blocked producers, messages put after close are dropped"""
+        with self.lock:
+            self.closed = True
+            self.not_full.notify_all()
+            self.not_empty.notify_all()
+
+    def put(self, message, block=True, timeout=None):
+        """Add a message, returns False if it was dropped because the channel is closed"""
+        size = message_size(message)
+
+        with self.not_full:
+            if not self._wait_for_space(size, block, timeout):
+                return False
+
+            batch = self.coalesce.get(message[0])
+            if batch is not None and self._coalesce(batch, message, size):
+                return True
+
+            self.messages.append(message)
+            self.sizes.append(0)
+            self._batch = None
+            self._grow(size)
+            self.not_empty.notify()
+            return True
+
+    def _wait_for_space(self, size, block, timeout):
+        if self.closed:
+            return False
+
+        if self.nbytes + size <= self.max_bytes or not self.messages:
+            return True
+
+        if not block:
+            raise Full()
+
+        start = time.perf_counter()
+        deadline = None if timeout is None else start + timeout
+
+        while self.nbytes + size > self.max_bytes and self.messages and not self.closed:
+            remaining = None if deadline is None else deadline - time.perf_counter()
+
+            if remaining is not None and remaining <= 0:
+                raise Full()
+
+            self.not_full.wait(remaining)
+
+        metrics.observe('channel.blocked', time.perf_counter() - start)
+        return not self.closed
+
+    def _coalesce(self, batch, message, size):
+        tail = self.messages[-1] if self.messages else None
+
+        if tail is None:
+            return False
+
+        if tail is self._batch and tail[0] == batch and len(tail[1]) < self.max_batch:
+            tail[1].append(message[1:])
+
+        elif tail is not self._batch and tail[0] == message[0]:
+            # consumer is behind, turn the waiting item into a batch
+            self._batch = (batch, [tail[1:], message[1:]])
+            self.messages[-1] = self._batch
+
+        else:
+            return False
+
+        self._grow(size)
+        metrics.inc('channel.coalesced')
+        return True
+
+    def _grow(self, size):
+        self.sizes[-1] += size
+        self.nbytes += size
+        self.peak_bytes = max(self.peak_bytes, self.nbytes)
+
+    def get(self, block=True, timeout=None):
+        with self.not_empty:
+            if not block:
+                if not self.messages:
+                    raise Empty()
+
+            elif not self.not_empty.wait_for(lambda: self.messages or self.closed, timeout) or not self.messages:
+                raise Empty()
+
+            message = self.messages.popleft()
+            if message is self._batch:
+                self._batch = None
+
+            self.nbytes -= self.sizes.popleft()
+            self.not_full.notify_all()
+            return message
@@ -0,0 +1,118 @@
+"""Run the library actions without Qt or VLC, results are printed as JSON lines
+
+    player-cli list
+    player-cli open_folder /videos /mnt/videos --per-device=2
+    player-cli check_duplicates /videos
+
+"""
+from contextlib import redirect_stdout
+import json
+import queue as queues
+import sys
+import threading
+import time
+
+from player.actions import discover_commands
+
+
+def parse_value(value):
+    """Decode numbers, booleans and lists, anything else is a string"""
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def parse_arguments(argv):
+    """Split the action arguments into positional and ``--key=value`` arguments"""
+    args = []
+    kwargs = dict()
+    argv = list(argv)
+
+    while argv:
+        arg = argv.pop(0)
+
+        if not arg.startswith('--'):
+            args.append(arg)
+            continue
+
+        key, eq, value = arg[2:].partition('=')
+        if not eq:
+            value = argv.pop(0) if argv and not argv[0].startswith('--') else 'true'
+
+        kwargs[key.replace('-', '_')] = parse_value(value)
+
+    return args, kwargs
+
+
+class JsonLines:
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, event, **data):
+        self.out.write(json.dumps(dict(event=event, **data), default=str))
+        self.out.write('\n')
+        self.out.flush()
+
+
+def run(action, args, kwargs, out, progress=1.0):
+    """Run an action in a thread and print its messages as they arrive"""
+    queue = queues.Queue()
+    errors = []
+    count = 0
+
+    def target():
+        try:
+            action(queue, *args, **kwargs)
+        except Exception as err:
+            errors.append(err)
+
+    start = time.time()
+    last = start
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+
+    while worker.is_alive() or not queue.empty():
+        try:
+            message = queue.get(timeout=0.1)
+            out.write('message', type=message[0], args=list(message[1:]))
+            count += 1
+        except queues.Empty:
+            pass
+
+        now = time.time()
+        if now - last > progress:
+            out.write('progress', messages=count, elapsed=now - start)
+            last = now
+
+    for err in errors:
+        out.write('error', type=type(err).__name__, message=str(err))
+
+    out.write('done', messages=count, elapsed=time.time() - start, success=not errors)
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    out = JsonLines(sys.stdout)
+    commands = discover_commands()
+
+    if not argv or argv[0] in ('-h', '--help', 'list'):
+        for name, module in sorted(commands.items()):
+            out.write('action', name=name, doc=(module.action.__doc__ or '').strip())
+        return 0
+
+    name, *rest = argv
+    if name not in commands:
+        out.write('error', type='UnknownAction', message=f'{name} is not an action')
+        return 2
+
+    args, kwargs = parse_arguments(rest)
+
+    # Actions print human readable logs, keep stdout for JSON
+    with redirect_stdout(sys.stderr):
+        return run(commands[name].action, args, kwargs, out)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
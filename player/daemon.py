@@ -0,0 +1,394 @@
+"""Library service shared by several player instances
+
+The daemon owns the scan, the index, the hash cache and the folder watcher.
+Players connect to it over a local socket instead of scanning the library
+themselves.
+
+    player-library /videos /mnt/videos --port 8765
+    player /videos --library 127.0.0.1:8765
+
+Protocol: every frame is a 4 bytes big endian length followed by a compact
+JSON object. A request is ``{"id": 1, "op": "query", ...}`` and its response
+``{"id": 1, "result": ...}`` or ``{"id": 1, "error": "..."}``. Several
+requests can be sent in a single frame with ``{"batch": [request, ...]}``.
+A connection that sent ``subscribe`` receives ``{"event": "changes", ...}``
+frames whenever the library changes.
+"""
+import json
+import queue as queues
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+from player.library import ADDED, MOVED, REMOVED, FolderWatcher, Library
+
+
+NAMESPACE = 'LIBRARY'
+RESULT = f'{NAMESPACE}_ITEM'
+REMOVE = f'{NAMESPACE}_REMOVE'
+MOVE = f'{NAMESPACE}_MOVE'
+READY = f'{NAMESPACE}_READY'
+QUERY = f'{NAMESPACE}_QUERY'
+
+LENGTH = struct.Struct('>I')
+
+
+def send_frame(sock, data):
+    payload = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    sock.sendall(LENGTH.pack(len(payload)) + payload)
+
+
+def _read(sock, size):
+    data = bytearray()
+
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('Connection closed')
+        data += chunk
+
+    return bytes(data)
+
+
+def recv_frame(sock):
+    size, = LENGTH.unpack(_read(sock, LENGTH.size))
+    return json.loads(_read(sock, size).decode('utf-8'))
+
+
+class LibraryService:
+    """Operations available to the clients"""
+
+    def __init__(self, library, watcher):
+        self.library = library
+        self.watcher = watcher
+
+    def ping(self):
+        return 'pong'
+
+    def stats(self):
+        return dict(
+            items=len(self.library),
+            version=self.library.version,
+            folders=len(self.watcher.folders),
+            scanned=self.watcher.scanned.is_set(),
+        )
+
+    def snapshot(self):
+        version, items = self.library.snapshot()
+        return dict(version=version, items=items)
+
+    def changes(self, since):
+        changes = self.library.changes_since(since)
+
+        if changes is None:
+            return dict(snapshot=self.snapshot())
+
+        return dict(version=self.library.version, changes=changes)
+
+    def query(self, text='', tags=(), limit=None):
+        return self.library.query(text, tags, limit)
+
+    def search(self, text, limit=None):
+        return self.library.search(text, limit)
+
+    def tag(self, paths, tag):
+        self.library.tag(paths, tag)
+
+    def untag(self, paths, tag):
+        self.library.untag(paths, tag)
+
+    def hash(self, paths):
+        return {path: self.library.hash(path) for path in paths}
+
+    def rescan(self):
+        self.watcher.poll()
+        return self.library.version
+
+    def call(self, request):
+        op = request.get('op', '')
+
+        if op.startswith('_') or op in ('call',) or not hasattr(self, op):
+            raise ValueError(f'Unknown operation {op}')
+
+        kwargs = {k: v for k, v in request.items() if k not in ('id', 'op')}
+        return getattr(self, op)(**kwargs)
+
+
+class Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        service = self.server.service
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        while True:
+            try:
+                frame = recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+
+            if 'batch' in frame:
+                send_frame(self.request, dict(batch=[self.execute(service, r) for r in frame['batch']]))
+                continue
+
+            if frame.get('op') == 'subscribe':
+                self.subscribe(frame.get('since', 0))
+                return
+
+            send_frame(self.request, self.execute(service, frame))
+
+    @staticmethod
+    def execute(service, request):
+        try:
+            return dict(id=request.get('id'), result=service.call(request))
+        except Exception as err:
+            return dict(id=request.get('id'), error=f'{type(err).__name__}: {err}')
+
+    def subscribe(self, since):
+        """Push the changes to the client, grouped every ``server.push_interval`` seconds.
+
+        Updates have ``scanned=True`` once the first full scan is done, the first of them
+        is sent even if nothing changed.
+        """
+        service = self.server.service
+        version = since
+        sent_scanned = False
+
+        try:
+            while not self.server.stopped.is_set():
+                # read before the changes, so a scanned update contains the whole scan
+                scanned = service.watcher.scanned.is_set()
+
+                if service.library.version != version or scanned != sent_scanned:
+                    update = service.changes(version)
+                    send_frame(self.request, dict(event='changes', scanned=scanned, **update))
+                    version = update.get('version', update.get('snapshot', {}).get('version', version))
+                    sent_scanned = scanned
+
+                self.server.stopped.wait(self.server.push_interval)
+        except (ConnectionError, OSError):
+            return
+
+
+class LibraryServer(socketserver.ThreadingTCPServer):
+    """Scan the roots, watch them and serve the library on ``address``"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, roots, address=('127.0.0.1', 0), poll_interval=5, push_interval=0.05):
+        super().__init__(address, Handler)
+        self.library = Library()
+        self.watcher = FolderWatcher(self.library, roots)
+        self.service = LibraryService(self.library, self.watcher)
+        self.poll_interval = poll_interval
+        self.push_interval = push_interval
+        self.stopped = threading.Event()
+        self.threads = []
+
+    def _watch(self):
+        self.watcher.scan()
+
+        while not self.stopped.wait(self.poll_interval):
+            self.watcher.poll()
+
+    def start(self):
+        """Serve in background threads"""
+        for target in (self._watch, self.serve_forever):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.shutdown()
+        self.server_close()
+
+
+class LibraryError(Exception):
+    pass
+
+
+class LibraryClient:
+    """Connection pool to a library server.
+
+    Parameters
+    ----------
+    address: tuple
+        ``(host, port)`` of the server
+
+    pool_size: int
+        maximum number of idle connections kept open
+    """
+
+    def __init__(self, address, pool_size=4, timeout=30):
+        self.address = tuple(address)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.idle = queues.LifoQueue()
+        self.ids = 0
+        self.lock = threading.Lock()
+        self.subscriptions = []
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _acquire(self):
+        try:
+            return self.idle.get(block=False)
+        except queues.Empty:
+            return self._connect()
+
+    def _release(self, sock):
+        if self.idle.qsize() < self.pool_size:
+            self.idle.put(sock)
+        else:
+            sock.close()
+
+    def _request(self, op, kwargs):
+        with self.lock:
+            self.ids += 1
+            return dict(id=self.ids, op=op, **kwargs)
+
+    def _exchange(self, frame):
+        sock = self._acquire()
+
+        try:
+            send_frame(sock, frame)
+            response = recv_frame(sock)
+        except Exception:
+            sock.close()
+            raise
+
+        self._release(sock)
+        return response
+
+    @staticmethod
+    def _result(response):
+        if 'error' in response:
+            raise LibraryError(response['error'])
+        return response['result']
+
+    def call(self, op, **kwargs):
+        return self._result(self._exchange(self._request(op, kwargs)))
+
+    def batch(self, calls):
+        """Send several ``(op, kwargs)`` in one round trip"""
+        frame = dict(batch=[self._request(op, kwargs) for op, kwargs in calls])
+        return [self._result(r) for r in self._exchange(frame)['batch']]
+
+    def query(self, text='', tags=(), limit=None):
+        return [tuple(item) for item in self.call('query', text=text, tags=list(tags), limit=limit)]
+
+    def search(self, text, limit=None):
+        return [tuple(item) for item in self.call('search', text=text, limit=limit)]
+
+    def subscribe(self, callback, since=0):
+        """Call ``callback(update)`` from a background thread for every change"""
+        sock = self._connect()
+        sock.settimeout(None)
+        send_frame(sock, dict(op='subscribe', since=since))
+
+        def listen():
+            try:
+                while True:
+                    callback(recv_frame(sock))
+            except (ConnectionError, OSError):
+                pass
+
+        thread = threading.Thread(target=listen, daemon=True)
+        thread.start()
+        self.subscriptions.append(sock)
+        return thread
+
+    def close(self):
+        for sock in self.subscriptions:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+        while not self.idle.empty():
+            self.idle.get().close()
+
+
+def forward_changes(queue):
+    """Subscription callback translating the library changes to player messages.
+
+    ``READY`` is sent once, with the first update sent after the service finished its first scan.
+    """
+    synced = []
+
+    def callback(update):
+        snapshot = update.get('snapshot')
+
+        if snapshot is not None:
+            for name, path in snapshot['items']:
+                queue.put((RESULT, name, path))
+
+        for op, name, path, previous in update.get('changes', []):
+            if op == ADDED:
+                queue.put((RESULT, name, path))
+            elif op == REMOVED:
+                queue.put((REMOVE, name, path))
+            elif op == MOVED:
+                queue.put((MOVE, name, path, previous))
+
+        if update.get('scanned') and not synced:
+            synced.append(True)
+            queue.put((READY,))
+
+    return callback
+
+
+def query_action(queue, client, text):
+    """Filter the playlist on the service, ``?text`` is a full text search.
+
+    Runs outside of the UI thread, pushes ``(QUERY, text, [(name, path)], error)``,
+    ``error`` is set when the service could not answer
+    """
+    try:
+        if text.startswith('?'):
+            items = client.search(text[1:])
+        else:
+            items = client.query(text)
+
+    except (OSError, LibraryError) as err:
+        queue.put((QUERY, text, [], str(err)))
+        return
+
+    queue.put((QUERY, text, items, None))
+
+
+def parse_address(value):
+    host, _, port = value.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Library service shared by player instances')
+    parser.add_argument('folder', type=str, nargs='+', help="Library folders")
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--poll', type=float, default=5, help="Seconds between two folder polls")
+    args = parser.parse_args(argv)
+
+    server = LibraryServer(args.folder, (args.host, args.port), poll_interval=args.poll).start()
+    print(f'Serving library on {server.server_address[0]}:{server.server_address[1]}')
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
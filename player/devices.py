@@ -0,0 +1,111 @@
+from collections import defaultdict
+from multiprocessing.dummy import Pool
+import os
+import queue as queues
+
+
+def as_roots(folders):
+    """Accept a single folder or a list of folders"""
+    if isinstance(folders, (str, os.PathLike)):
+        return [os.fspath(folders)]
+
+    return [os.fspath(f) for f in folders]
+
+
+def device_of(path):
+    """Device id of the disk holding a path"""
+    return os.stat(path).st_dev
+
+
+def usable_roots(folders):
+    """Roots that can be scanned, missing or unreadable ones are reported and skipped"""
+    roots = []
+
+    for root in as_roots(folders):
+        if not os.path.isdir(root):
+            print(f'Skipping {root}: not a folder')
+            continue
+
+        try:
+            device_of(root)
+        except OSError as err:
+            print(f'Skipping {root}: {err}')
+            continue
+
+        roots.append(root)
+
+    return roots
+
+
+def find_root(path, roots):
+    """Return the root folder containing the path, the deepest one if they are nested"""
+    path = os.path.abspath(path)
+    found = None
+
+    for root in roots:
+        root = os.path.abspath(root)
+
+        if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+            if found is None or len(root) > len(found):
+                found = root
+
+    return found
+
+
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+
+class DeviceScheduler:
+    """Run I/O jobs with one worker pool per device.
+
+    Jobs on the same disk are limited to ``per_device`` concurrent workers
+    (one is best for spinning disks) while different disks are processed in
+    parallel, so the total time approaches the one of the slowest disk.
+
+    Parameters
+    ----------
+    per_device: int
+        default number of concurrent jobs per device
+
+    limits: dict
+        per device override, device id to number of jobs
+    """
+
+    def __init__(self, per_device=1, limits=None):
+        self.per_device = per_device
+        self.limits = limits or dict()
+
+    def map(self, fun, items, device):
+        """Call ``fun`` on every item, yields the results as they complete.
+
+        ``device`` returns the device id of an item.
+        """
+        groups = defaultdict(list)
+        for item in items:
+            groups[device(item)].append(item)
+
+        results = queues.Queue()
+        pools = []
+        total = 0
+
+        try:
+            for dev, group in groups.items():
+                pool = Pool(self.limits.get(dev, self.per_device))
+                pools.append(pool)
+
+                for item in group:
+                    pool.apply_async(fun, (item,), callback=results.put, error_callback=lambda e: results.put(_Failed(e)))
+                    total += 1
+
+            for _ in range(total):
+                result = results.get()
+
+                if isinstance(result, _Failed):
+                    raise result.error
+
+                yield result
+        finally:
+            for pool in pools:
+                pool.terminate()
@@ -0,0 +1,121 @@
+import fnmatch
+import os
+import re
+
+from player.staging import DELETED
+
+
+IGNORE_FILE_EXTENSIONS = (
+    'nfo', 'txt', 'exe' ,'pdf', 'gif', 'css', 'js', 'html', 'srt',
+
+    #
+    'png', 'jpg', 'jpeg', 'webm'
+    #
+)
+
+# Folders created by the player itself, relative to the base folder
+PRUNED_FOLDERS = (DELETED, '.normalize')
+
+
+def compile_rules(globs=(), regexes=()):
+    """Compile glob and regex rules into a single case-insensitive pattern.
+
+    Rules are matched against the path relative to the scanned folder,
+    using ``/`` as separator.
+    """
+    rules = [fnmatch.translate(g) for g in globs]
+    rules.extend(f'(?:{r})' for r in regexes)
+
+    if not rules:
+        return None
+
+    return re.compile('|'.join(rules), re.IGNORECASE)
+
+
+class FileFilter:
+    """Decide which files and folders a scan should look at.
+
+    Parameters
+    ----------
+    extensions: list[str]
+        file extensions to ignore, case insensitive
+
+    ignore: list[str]
+        glob rules of files to ignore
+
+    ignore_regex: list[str]
+        regex rules of files to ignore
+
+    include: list[str]
+        glob rules of files to keep even when an ignore rule matches
+
+    prune: list[str]
+        glob rules of folders that are not listed at all
+
+    Examples
+    --------
+
+    >>> f = FileFilter(ignore=['*sample*'])
+    >>> f.accept('movie.MKV', 'movie.MKV')
+    True
+    >>> f.accept('poster.JPG', 'poster.JPG')
+    False
+    >>> f.accept('movie-sample.mkv', 'extras/movie-sample.mkv')
+    False
+    >>> f.accept_folder('deleted')
+    False
+
+    """
+
+    def __init__(self, extensions=IGNORE_FILE_EXTENSIONS, ignore=(), ignore_regex=(), include=(), prune=PRUNED_FOLDERS):
+        self.extensions = frozenset(e.lower().lstrip('.') for e in extensions)
+        self.ignore = compile_rules(ignore, ignore_regex)
+        self.include = compile_rules(include)
+        self.prune = compile_rules(prune)
+
+    def accept(self, name, relpath):
+        """Return True if the file should be scanned"""
+        if self.include is not None and self.include.match(relpath):
+            return True
+
+        _, dot, ext = name.rpartition('.')
+        if dot and ext.lower() in self.extensions:
+            return False
+
+        if self.ignore is not None and self.ignore.match(relpath):
+            return False
+
+        return True
+
+    def accept_folder(self, relpath):
+        """Return True if the folder should be listed"""
+        return self.prune is None or not self.prune.match(relpath)
+
+    def walk(self, base):
+        """Walk a folder, yields ``(root, file, path)`` for every accepted file.
+
+        Pruned folders are removed from the walk so their content is never listed.
+        """
+        for root, dirs, files in os.walk(base):
+            rel = os.path.relpath(root, base)
+            prefix = '' if rel == '.' else rel.replace(os.sep, '/') + '/'
+
+            if self.prune is not None:
+                dirs[:] = [d for d in dirs if self.accept_folder(prefix + d)]
+
+            for file in files:
+                if self.accept(file, prefix + file):
+                    yield root, file, os.path.join(root, file)
+
+
+default_filter = FileFilter()
+
+
+def search(text, names):
+    """Playlist names containing the text, case insensitive
+
+    >>> search('ep', ['Ep1.mkv', 'movie.mkv', 'show-ep2.mkv'])
+    ['Ep1.mkv', 'show-ep2.mkv']
+    """
+    text = text.lower()
+    return [name for name in names if text in name.lower()]
@@ -0,0 +1,181 @@
+from collections import defaultdict
+import json
+import os
+import threading
+import time
+
+from player.actions.check_duplicates import sample_hash
+
+
+def identity(path):
+    """Identity of a file that survives renames and moves on the same device"""
+    stat = os.stat(path)
+    return (stat.st_dev, stat.st_ino, stat.st_size)
+
+
+class FileRecord:
+    """What we know about a file, follows the file when it is moved (see ``models.Files``)"""
+
+    __slots__ = ('identity', 'partial', 'access_count', 'last_accessed')
+
+    def __init__(self, identity, partial=None, access_count=0, last_accessed=None):
+        self.identity = tuple(identity)
+        self.partial = partial
+        self.access_count = access_count
+        self.last_accessed = last_accessed
+
+    def to_json(self):
+        return [list(self.identity), self.partial, self.access_count, self.last_accessed]
+
+    @staticmethod
+    def from_json(data):
+        return FileRecord(*data)
+
+
+class IdentityIndex:
+    """Track files by ``(st_dev, inode, size)`` so moves are not seen as a delete and an add.
+
+    Files moved across devices get a new inode, they are matched on their size
+    and :func:`sample_hash` instead. The sampled hash is only computed for files
+    that were played (they have stats worth keeping) and for the candidates
+    of a move, so no content is re-hashed during a rescan.
+    """
+
+    def __init__(self):
+        self.records = dict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, path):
+        return self.records.get(path)
+
+    def track(self, path):
+        """Record the identity of a file, returns its record"""
+        ident = identity(path)
+
+        with self.lock:
+            record = self.records.get(path)
+
+            if record is None or record.identity != ident:
+                record = FileRecord(ident)
+                self.records[path] = record
+
+        return record
+
+    def track_many(self, paths):
+        for path in paths:
+            if path in self.records:
+                continue
+
+            try:
+                self.track(path)
+            except OSError:
+                pass
+
+    def forget(self, path):
+        with self.lock:
+            self.records.pop(path, None)
+
+    def record_access(self, path):
+        """The file was played"""
+        try:
+            record = self.records.get(path) or self.track(path)
+
+            if record.partial is None:
+                record.partial = sample_hash(path)
+        except OSError:
+            return None
+
+        record.access_count += 1
+        record.last_accessed = time.time()
+        return record
+
+    def move(self, old, new):
+        with self.lock:
+            record = self.records.pop(old, None)
+
+            if record is not None:
+                self.records[new] = record
+
+        try:
+            if record is not None:
+                record.identity = identity(new)
+        except OSError:
+            pass
+
+    def reconcile(self, removed, added):
+        """Find which of the removed files reappeared as one of the added files.
+
+        Returns the ``(old, new)`` moves, the records are moved to their new path.
+        """
+        by_identity = dict()
+        by_size = defaultdict(list)
+
+        for old in removed:
+            record = self.records.get(old)
+
+            if record is None:
+                continue
+
+            by_identity[record.identity] = old
+
+            if record.partial is not None:
+                by_size[record.identity[2]].append(old)
+
+        moves = []
+        unmatched = []
+
+        for new in added:
+            try:
+                ident = identity(new)
+            except OSError:
+                continue
+
+            old = by_identity.pop(ident, None)
+            if old is not None:
+                moves.append((old, new))
+            else:
+                unmatched.append((new, ident[2]))
+
+        matched = {old for old, _ in moves}
+
+        for new, size in unmatched:
+            candidates = [old for old in by_size.get(size, []) if old not in matched]
+            if not candidates:
+                continue
+
+            partial = sample_hash(new)
+            for old in candidates:
+                if self.records[old].partial == partial:
+                    moves.append((old, new))
+                    matched.add(old)
+                    break
+
+        for old, new in moves:
+            self.move(old, new)
+
+        return moves
+
+    def save(self, path):
+        with self.lock:
+            data = {p: r.to_json() for p, r in self.records.items()}
+
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path):
+        index = IdentityIndex()
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return index
+
+        index.records = {p: FileRecord.from_json(r) for p, r in data.items()}
+        return index
@@ -0,0 +1,28 @@
+import json
+import os
+
+
+def append(path, records):
+    """Append records to a JSON lines journal, the write is flushed to disk once per call"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record))
+            f.write('\n')
+
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read(path):
+    """Read the records of a journal, a truncated last line (crash) is ignored"""
+    if not os.path.exists(path):
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
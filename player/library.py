@@ -0,0 +1,313 @@
+from collections import defaultdict
+import hashlib
+import os
+import threading
+
+from player.actions.check_duplicates import compute_hash
+from player.filters import default_filter, search
+from player.identity import IdentityIndex
+from player.search import SearchIndex
+
+
+ADDED = 'add'
+REMOVED = 'remove'
+MOVED = 'move'
+
+
+class Library:
+    """Index of the videos of a set of folders.
+
+    Every change bumps ``version`` and is kept in a change log so clients can
+    ask for the changes since the last version they saw. Changes are
+    ``(op, name, path, previous)``, ``previous`` is the old path of a moved file.
+
+    Parameters
+    ----------
+    max_changes: int
+        size of the change log, clients that are further behind get a full snapshot
+    """
+
+    def __init__(self, max_changes=100000):
+        self.items = dict()
+        self.paths = dict()
+        self.tags = defaultdict(set)
+        self.hashes = dict()
+        self.version = 0
+        self.changes = []
+        self.max_changes = max_changes
+        self.index = SearchIndex()
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.items)
+
+    def _log(self, op, name, path, previous=None):
+        self.version += 1
+        self.changes.append((self.version, op, name, path, previous))
+
+        if len(self.changes) > self.max_changes:
+            del self.changes[:len(self.changes) - self.max_changes]
+
+    def unique_name(self, root, path):
+        """Name of a file in the library, like open_folder files with the same name
+        as another file are named by their path relative to their root (or their full path)"""
+        with self.lock:
+            name = self.items.get(path)
+            if name is not None:
+                return name
+
+            name = os.path.basename(path)
+            if self.paths.get(name, path) != path:
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+
+                if self.paths.get(name, path) != path:
+                    name = path
+
+            return name
+
+    def add(self, name, path):
+        with self.lock:
+            previous = self.items.get(path)
+            if previous == name:
+                return False
+
+            if previous is not None:
+                self.paths.pop(previous, None)
+
+            self.items[path] = name
+            self.paths[name] = path
+            self.index.add(name, path)
+            self._log(ADDED, name, path)
+            return True
+
+    def remove(self, path):
+        with self.lock:
+            name = self.items.pop(path, None)
+
+            if name is None:
+                return False
+
+            self.paths.pop(name, None)
+
+            for paths in self.tags.values():
+                paths.discard(path)
+
+            self.hashes.pop(path, None)
+            self.index.remove(path)
+            self._log(REMOVED, name, path)
+            return True
+
+    def move(self, old, new):
+        """A file was moved, it keeps its tags and its hash"""
+        with self.lock:
+            name = self.items.get(new)
+
+            previous = self.items.pop(old, None) if name is not None else None
+            if previous is None:
+                return False
+
+            self.paths.pop(previous, None)
+
+            for paths in self.tags.values():
+                if old in paths:
+                    paths.discard(old)
+                    paths.add(new)
+
+            cached = self.hashes.pop(old, None)
+            if cached is not None:
+                try:
+                    stat = os.stat(new)
+                    self.hashes[new] = ((stat.st_size, stat.st_mtime), cached[1])
+                except OSError:
+                    pass
+
+            self.index.move(old, new, name)
+            self._log(MOVED, name, new, old)
+            return True
+
+    def snapshot(self):
+        """All the items and the version they correspond to"""
+        with self.lock:
+            return self.version, [(name, path) for path, name in self.items.items()]
+
+    def changes_since(self, version):
+        """Changes after a version, None if the log does not go back that far"""
+        with self.lock:
+            if version == self.version:
+                return []
+
+            if not self.changes or self.changes[0][0] > version + 1:
+                return None
+
+            return [c[1:] for c in self.changes if c[0] > version]
+
+    def tag(self, paths, tag):
+        with self.lock:
+            paths = [p for p in paths if p in self.items]
+            self.tags[tag].update(paths)
+            self.index.tag(paths, tag)
+
+    def untag(self, paths, tag):
+        with self.lock:
+            self.tags[tag].difference_update(paths)
+            self.index.untag(paths, tag)
+
+    def search(self, text, limit=None):
+        """Full text search on the names, folders and tags, best matches first"""
+        return self.index.query(text, limit)
+
+    def query(self, text='', tags=(), limit=None):
+        """Items whose name contains the text and that have all the tags"""
+        with self.lock:
+            paths = list(self.items)
+
+            for tag in tags:
+                tagged = self.tags.get(tag, set())
+                paths = [p for p in paths if p in tagged]
+
+            names = {self.items[p]: p for p in paths}
+            matches = search(text, sorted(names)) if text else sorted(names)
+
+            if limit is not None:
+                matches = matches[:limit]
+
+            return [(name, names[name]) for name in matches]
+
+    def hash(self, path):
+        """MD5 of a file of the library, cached until the file changes"""
+        if path not in self.items:
+            raise ValueError(f'{path} is not in the library')
+
+        stat = os.stat(path)
+        key = (stat.st_size, stat.st_mtime)
+
+        with self.lock:
+            cached = self.hashes.get(path)
+
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        digest = compute_hash(hashlib.md5(), path)
+
+        with self.lock:
+            self.hashes[path] = (key, digest)
+
+        return digest
+
+
+class FolderWatcher:
+    """Poll the folders of a library, only folders whose mtime changed are listed again.
+
+    Adding, removing or renaming a file updates the mtime of its folder, so a
+    poll costs one ``stat`` per folder instead of a full scan. Removed files
+    that reappear somewhere else during the same poll are reported as moves.
+    Scans and polls can be called from any thread, they run one at a time.
+    """
+
+    def __init__(self, library, roots, file_filter=default_filter):
+        self.library = library
+        self.roots = [os.path.abspath(r) for r in roots]
+        self.file_filter = file_filter
+        self.folders = dict()
+        self.files = defaultdict(set)
+        self.identities = IdentityIndex()
+        self.added = []
+        self.removed = []
+        self.lock = threading.Lock()
+        # set once the first full scan is done
+        self.scanned = threading.Event()
+
+    def _relative(self, root, path):
+        rel = os.path.relpath(path, root)
+        return '' if rel == '.' else rel.replace(os.sep, '/') + '/'
+
+    def _list(self, root, folder):
+        """List a single folder, returns its sub folders"""
+        try:
+            mtime = os.stat(folder).st_mtime
+            entries = list(os.scandir(folder))
+        except OSError:
+            self._forget(folder)
+            return []
+
+        prefix = self._relative(root, folder)
+        found = set()
+        folders = []
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if self.file_filter.accept_folder(prefix + entry.name):
+                    folders.append(entry.path)
+
+            elif self.file_filter.accept(entry.name, prefix + entry.name):
+                found.add(entry.path)
+
+                if self.library.add(self.library.unique_name(root, entry.path), entry.path):
+                    self.added.append(entry.path)
+
+        self.removed.extend(self.files[folder] - found)
+
+        self.folders[folder] = (root, mtime)
+        self.files[folder] = found
+        return folders
+
+    def _forget(self, folder):
+        """A folder disappeared, remove it and everything below"""
+        prefix = folder.rstrip(os.sep) + os.sep
+
+        for known in [f for f in self.folders if f == folder or f.startswith(prefix)]:
+            self.removed.extend(self.files.pop(known, ()))
+            self.folders.pop(known, None)
+
+    def _flush(self):
+        """Apply the removals, the files that were only moved keep their state"""
+        added, removed = self.added, self.removed
+        self.added, self.removed = [], []
+
+        moves = self.identities.reconcile(removed, added)
+        moved = {old for old, _ in moves}
+
+        for old, new in moves:
+            self.library.move(old, new)
+
+        for path in removed:
+            if path not in moved:
+                self.library.remove(path)
+                self.identities.forget(path)
+
+        self.identities.track_many(added)
+
+    def _scan(self, root, folder):
+        pending = [folder]
+
+        while pending:
+            for sub in self._list(root, pending.pop()):
+                if sub not in self.folders:
+                    pending.append(sub)
+
+    def scan(self):
+        """Full scan of every root"""
+        with self.lock:
+            for root in self.roots:
+                self._scan(root, root)
+
+            self._flush()
+            self.scanned.set()
+
+    def poll(self):
+        """Rescan the folders that changed since the last poll"""
+        with self.lock:
+            for folder, (root, mtime) in list(self.folders.items()):
+                if folder not in self.folders:
+                    continue
+
+                try:
+                    current = os.stat(folder).st_mtime
+                except OSError:
+                    self._forget(folder)
+                    continue
+
+                if current != mtime:
+                    self._scan(root, folder)
+
+            self._flush()
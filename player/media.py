@@ -0,0 +1,289 @@
+import os
+import sys
+
+
+def import_vlc():
+    if sys.platform == "win32":
+        import importlib_resources
+
+        path = importlib_resources.files('player.binaries.win64')
+        os.environ['PYTHON_VLC_LIB_PATH'] = str(path / 'libvlc.dll')
+
+    import vlc
+    return vlc
+
+
+# Events sent to the listeners, ``listener(event, value)``
+POSITION = 'position'
+END = 'end'
+ERROR = 'error'
+STATE = 'state'
+
+# States
+PLAYING = 'playing'
+PAUSED = 'paused'
+STOPPED = 'stopped'
+ENDED = 'ended'
+FAILED = 'error'
+
+
+class MediaBackend:
+    """Play media and notify the listeners when something changes.
+
+    Listeners can be called from any thread, they must not call back into
+    the backend directly.
+    """
+
+    def __init__(self):
+        self.listeners = []
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def notify(self, event, value=None):
+        for listener in self.listeners:
+            listener(event, value)
+
+    def open(self, path):
+        """Load a file and start playing it, returns its title"""
+        raise NotImplementedError()
+
+    def pause(self):
+        raise NotImplementedError()
+
+    def get_state(self):
+        raise NotImplementedError()
+
+    def get_position(self):
+        raise NotImplementedError()
+
+    def set_position(self, position):
+        raise NotImplementedError()
+
+    def get_time(self):
+        raise NotImplementedError()
+
+    def set_time(self, time, fast=False):
+        """Seek to ``time`` ms, a fast seek may land on the keyframe before it"""
+        raise NotImplementedError()
+
+    def get_length(self):
+        raise NotImplementedError()
+
+    def get_volume(self):
+        raise NotImplementedError()
+
+    def set_volume(self, volume):
+        raise NotImplementedError()
+
+    def get_keyframes(self):
+        """Keyframe times (ms) of the current file if the backend knows them"""
+        return None
+
+    def set_window(self, win_id):
+        pass
+
+    def is_playing(self):
+        return self.get_state() == PLAYING
+
+
+class VLCBackend(MediaBackend):
+    """libVLC player, VLC events are forwarded to the listeners"""
+
+    def __init__(self):
+        super().__init__()
+        self.vlc = vlc = import_vlc()
+        self.instance = vlc.Instance()
+        self.player = self.instance.media_player_new()
+        self.media = None
+
+        events = self.player.event_manager()
+        attach = [
+            (vlc.EventType.MediaPlayerPositionChanged, lambda e: self.notify(POSITION, e.u.new_position)),
+            (vlc.EventType.MediaPlayerEndReached, lambda e: self.notify(END)),
+            (vlc.EventType.MediaPlayerEncounteredError, lambda e: self.notify(ERROR, 'VLC could not play the media')),
+            (vlc.EventType.MediaPlayerPlaying, lambda e: self.notify(STATE, PLAYING)),
+            (vlc.EventType.MediaPlayerPaused, lambda e: self.notify(STATE, PAUSED)),
+            (vlc.EventType.MediaPlayerStopped, lambda e: self.notify(STATE, STOPPED)),
+        ]
+        for event, callback in attach:
+            events.event_attach(event, callback)
+
+        self._states = {
+            vlc.State.Playing: PLAYING,
+            vlc.State.Paused: PAUSED,
+            vlc.State.Ended: ENDED,
+            vlc.State.Error: FAILED,
+        }
+
+    def open(self, path):
+        self.media = self.instance.media_new(path)
+        self.player.set_media(self.media)
+        self.media.parse()
+        self.player.play()
+
+        print(
+            self.player.video_get_size(),
+            self.player.get_fps(),
+            self.player.get_length(),
+            self.player.get_time(),
+            self.player.is_seekable(),
+        )
+        return self.media.get_meta(self.vlc.Meta.Title)
+
+    def pause(self):
+        self.player.pause()
+
+    def get_state(self):
+        return self._states.get(self.player.get_state(), STOPPED)
+
+    def is_playing(self):
+        return bool(self.player.is_playing())
+
+    def get_position(self):
+        return self.player.get_position()
+
+    def set_position(self, position):
+        self.player.set_position(position)
+
+    def get_time(self):
+        return self.player.get_time()
+
+    def set_time(self, time, fast=False):
+        if fast:
+            try:
+                # libVLC 4 only, fast seeks land on the keyframe instead of decoding up to the exact time
+                self.player.set_time(time, True)
+                return
+            except TypeError:
+                pass
+
+        self.player.set_time(time)
+
+    def get_length(self):
+        return self.player.get_length()
+
+    def get_volume(self):
+        return self.player.audio_get_volume()
+
+    def set_volume(self, volume):
+        self.player.audio_set_volume(volume)
+
+    def set_window(self, win_id):
+        if sys.platform.startswith('linux'):
+            self.player.set_xwindow(win_id)
+        elif sys.platform == "win32":
+            self.player.set_hwnd(win_id)
+        elif sys.platform == "darwin":
+            self.player.set_nsobject(int(win_id))
+
+
+class FakeBackend(MediaBackend):
+    """Deterministic backend for tests, time only moves when :meth:`advance` is called
+
+    Parameters
+    ----------
+    lengths: dict
+        length in ms of the files, ``default_length`` for the others
+
+    keyframe_interval: int
+        simulate keyframes every ``keyframe_interval`` ms, fast seeks land on the previous keyframe
+
+    seek_cost: float
+        simulated cost (ms) of a seek, added to ``seek_time`` along with ``frame_cost``
+        for every ms decoded from the keyframe
+    """
+
+    def __init__(self, lengths=None, default_length=60000, keyframe_interval=None, seek_cost=0, frame_cost=0):
+        super().__init__()
+        self.lengths = lengths or dict()
+        self.default_length = default_length
+        self.keyframe_interval = keyframe_interval
+        self.seek_cost = seek_cost
+        self.frame_cost = frame_cost
+        self.seeks = 0
+        self.seek_time = 0
+        self.path = None
+        self.state = STOPPED
+        self.time = 0
+        self.volume = 100
+
+    def open(self, path):
+        self.path = path
+        self.time = 0
+        self._set_state(PLAYING)
+        return os.path.basename(path)
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            self.notify(STATE, state)
+
+    def pause(self):
+        if self.state == PLAYING:
+            self._set_state(PAUSED)
+        elif self.state == PAUSED:
+            self._set_state(PLAYING)
+
+    def advance(self, ms):
+        """Play for ``ms`` milliseconds"""
+        if self.state != PLAYING:
+            return
+
+        self._move(self.time + ms)
+
+        if self.time >= self.get_length():
+            self._set_state(ENDED)
+            self.notify(END)
+
+    def fail(self, message='fake error'):
+        self._set_state(FAILED)
+        self.notify(ERROR, message)
+
+    def get_state(self):
+        return self.state
+
+    def get_position(self):
+        length = self.get_length()
+        return self.time / length if length > 0 else 0.0
+
+    def set_position(self, position):
+        self.set_time(int(position * self.get_length()))
+
+    def get_keyframes(self):
+        if self.keyframe_interval is None or self.path is None:
+            return None
+        return list(range(0, self.get_length(), self.keyframe_interval))
+
+    def get_time(self):
+        return self.time
+
+    def set_time(self, time, fast=False):
+        time = max(0, min(time, self.get_length()))
+        self.seeks += 1
+        self.seek_time += self.seek_cost
+
+        if self.keyframe_interval:
+            keyframe = time - time % self.keyframe_interval
+
+            if fast:
+                time = keyframe
+            else:
+                self.seek_time += (time - keyframe) * self.frame_cost
+
+        self._move(time)
+
+    def _move(self, time):
+        self.time = max(0, min(time, self.get_length()))
+        self.notify(POSITION, self.get_position())
+
+    def get_length(self):
+        if self.path is None:
+            return -1
+        return self.lengths.get(self.path, self.default_length)
+
+    def get_volume(self):
+        return self.volume
+
+    def set_volume(self, volume):
+        self.volume = volume
@@ -0,0 +1,231 @@
+"""Lightweight counters, histograms and timed spans.
+
+Everything is a no-op until :meth:`Metrics.enable` is called, so the hooks
+can stay in the hot paths.
+
+>>> m = Metrics()
+>>> with m.span('work'):
+...     pass
+>>> m.stats()['counters']
+{}
+>>> m.enable()
+>>> m.inc('files', 2)
+>>> with m.span('work'):
+...     pass
+>>> m.stats()['counters']
+{'files': 2}
+>>> m.stats()['histograms']['work']['count']
+1
+"""
+from collections import defaultdict, deque
+from functools import wraps
+import json
+import math
+import os
+import threading
+import time
+
+
+class Histogram:
+    """Streaming histogram with power of 2 buckets"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.buckets = defaultdict(int)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.buckets[math.frexp(value)[1] if value > 0 else 0] += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket containing the quantile"""
+        target = q * self.count
+        seen = 0
+
+        for exp in sorted(self.buckets):
+            seen += self.buckets[exp]
+            if seen >= target:
+                return min(math.ldexp(1, exp), self.max)
+
+        return self.max
+
+    def to_json(self):
+        if self.count == 0:
+            return dict(count=0)
+
+        return dict(
+            count=self.count,
+            total=self.total,
+            mean=self.total / self.count,
+            min=self.min,
+            max=self.max,
+            p50=self.quantile(0.5),
+            p99=self.quantile(0.99),
+        )
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Time a block, the duration is added to the histogram of the same name"""
+
+    __slots__ = ('metrics', 'name', 'args', 'start')
+
+    def __init__(self, metrics, name, args):
+        self.metrics = metrics
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        end = time.perf_counter()
+        self.metrics.record(self.name, self.start, end, self.args)
+        return False
+
+
+class Metrics:
+    """Collect counters, histograms and trace events.
+
+    Parameters
+    ----------
+    max_events: int
+        number of trace events kept in memory, older events are dropped
+    """
+
+    def __init__(self, max_events=100000):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.histograms = defaultdict(Histogram)
+        self.events = deque(maxlen=max_events)
+        self.origin = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def inc(self, name, value=1):
+        if not self.enabled:
+            return
+
+        with self.lock:
+            self.counters[name] += value
+
+    def observe(self, name, value):
+        if not self.enabled:
+            return
+
+        with self.lock:
+            self.histograms[name].observe(value)
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return NULL_SPAN
+
+        return Span(self, name, args)
+
+    def timed(self, name):
+        """Decorator timing every call of a function"""
+        def decorator(fun):
+            @wraps(fun)
+            def wrapped(*args, **kwargs):
+                if not self.enabled:
+                    return fun(*args, **kwargs)
+
+                with Span(self, name, None):
+                    return fun(*args, **kwargs)
+
+            return wrapped
+        return decorator
+
+    def record(self, name, start, end, args=None):
+        event = dict(
+            name=name,
+            ph='X',
+            ts=(start - self.origin) * 1e6,
+            dur=(end - start) * 1e6,
+            pid=os.getpid(),
+            tid=threading.get_ident(),
+        )
+        if args:
+            event['args'] = args
+
+        with self.lock:
+            self.histograms[name].observe(end - start)
+            self.events.append(event)
+
+    def stats(self):
+        with self.lock:
+            return dict(
+                counters=dict(self.counters),
+                histograms={k: v.to_json() for k, v in self.histograms.items()},
+            )
+
+    def write_trace(self, path):
+        """Write the trace events in the Chrome trace format (chrome://tracing, Perfetto)"""
+        with self.lock:
+            events = list(self.events)
+
+        _write_json(path, dict(traceEvents=events, displayTimeUnit='ms'))
+
+    def dump_stats(self, path):
+        _write_json(path, dict(time=time.time(), **self.stats()))
+
+
+def _write_json(path, data):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class StatsDumper:
+    """Periodically write the stats to a file"""
+
+    def __init__(self, metrics, path, interval=10):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+        if self.thread is not None:
+            self.thread.join()
+
+        self.metrics.dump_stats(self.path)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.metrics.dump_stats(self.path)
+
+
+metrics = Metrics()
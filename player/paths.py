@@ -0,0 +1,18 @@
+import os
+
+
+def cache_dir(*parts):
+    """Return (and create) a folder inside the player cache directory.
+
+    Uses ``PLAYER_CACHE`` when set, otherwise ``XDG_CACHE_HOME/player``
+    and falls back to ``~/.cache/player``.
+    """
+    base = os.environ.get('PLAYER_CACHE')
+
+    if base is None:
+        xdg = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+        base = os.path.join(xdg, 'player')
+
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
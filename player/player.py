@@ -1,40 +1,59 @@
 from multiprocessing.dummy import Process
 from queue import Empty
-from multiprocessing import Manager
 import os
 import time
-import importlib_resources
 import sys
 
 from PyQt5 import QtWidgets, QtGui, QtCore
 
 
+from player.media import END, ENDED, ERROR, PLAYING, POSITION, STATE, VLCBackend
+from player.metrics import StatsDumper, metrics
+from player.channel import BoundedChannel
+from player.devices import as_roots, find_root
+from player.filters import search
+from player.identity import IdentityIndex
+from player.playlists import is_playlist
 from player.random_play import PlaylistAutoPlay
+from player.search import SearchIndex
+from player.seek import SeekScheduler
+from player.session import Session, load, session_file, write
+from player.staging import RESTORED, StagingWorker
+from player.thumbnails import MemoryLRU, ThumbnailGenerator
+from player.watchdog import StallWatchdog
 import player.actions.open_folder as open_folder
-import player.actions.delete as delete_file
 import player.actions.check_duplicates as check_duplicates
+import player.actions.import_playlist as import_playlist
+import player.playlists as playlists
+import player.daemon as daemon
+import player.thumbnails as thumbnails
 
 
-def import_vlc():
-    if sys.platform == "win32":
-        path = importlib_resources.files('player.binaries.win64')
-        os.environ['PYTHON_VLC_LIB_PATH'] = str(path / 'libvlc.dll')
-
-    import vlc
-    return vlc
-
-vlc = import_vlc()
+class Player(QtWidgets.QMainWindow):
+    # Backend events are delivered from the backend thread, this moves them to the UI thread
+    media_event = QtCore.pyqtSignal(str, object)
 
+    # Idle and busy interval of the UI timer, playback updates are event driven
+    IDLE_INTERVAL = 1000
+    BUSY_INTERVAL = 50
 
-class Player(QtWidgets.QMainWindow):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, backend=None):
         QtWidgets.QMainWindow.__init__(self, parent)
         self.setWindowTitle("Media Player")
 
         # Widgets Setup
-        self.instance = vlc.Instance()
-        self.vlcplayer = self.instance.media_player_new()
-        self.vlcplayer.audio_set_volume(0)
+        self.backend = backend or VLCBackend()
+        self.backend.set_volume(0)
+        self.media_event.connect(self._on_media_event)
+        self.backend.add_listener(self.media_event.emit)
+        self._play_id = 0
+        self._ended_id = None
+        # position to seek to once the media plays, VLC ignores seeks before that
+        self.resume_position = None
+        self.seeks = SeekScheduler(self.backend)
+        self.seek_timer = QtCore.QTimer(self)
+        self.seek_timer.setSingleShot(True)
+        self.seek_timer.timeout.connect(self._flush_seek)
         self.playlist = self._playlist()
         self.search = None
         self.playlist_items  = []
@@ -49,46 +68,249 @@ class Player(QtWidgets.QMainWindow):
         self.layout()
 
         # Playlist data
-        self.base_folder = None
+        self.base_folders = []
+        self.sort_playlist = True
+        self.per_device = 1
+        # (root, batch) of the deletes that can be undone, names of the restored files by batch
+        self.deleted = []
+        self.deleted_names = dict()
+        self.library = None
+        self.identities = IdentityIndex()
+        self.identity_file = None
+        self.restored_names = set()
         self.names = dict()
+        self.search_index = SearchIndex()
+        # a full text query is active and items were added since it ran
+        self.query_stale = False
         self.auto_play = PlaylistAutoPlay(self.names)
         # -------------
 
         self._shortcuts()
 
         # Async
-        self.manager = Manager()
-        self.queue = self.manager.Queue()
+        # Actions run in threads, scan results are merged into batches when the UI falls behind
+        self.queue = BoundedChannel(coalesce={
+            open_folder.RESULT: open_folder.BATCH,
+            daemon.RESULT: open_folder.BATCH,
+        })
         self.timer = QtCore.QTimer(self)
-        self.timer.setInterval(250)
+        self.timer.setInterval(self.IDLE_INTERVAL)
         self.timer.timeout.connect(self._update_ui)
         self.timer.start()
         self._tasks = dict()
+        self.watchdog = None
+        self.staging = StagingWorker(self.queue).start()
+        # -------------
+
+        # Thumbnails
+        self.thumbnail_icons = MemoryLRU(256)
+        self.thumbnail_items = dict()
+        self.thumbnails = ThumbnailGenerator(self.queue).start()
+        self.playlist.verticalScrollBar().valueChanged.connect(self._refresh_thumbnails)
+        # -------------
+
+        # Session
+        self.session_file = None
+        self.restored = False
+        self.scanned = set()
+        # number of scans and playlist imports that did not end yet
+        self.scans = 0
+        self.session_timer = QtCore.QTimer(self)
+        self.session_timer.setInterval(60 * 1000)
+        self.session_timer.timeout.connect(self.save_session)
+        self.session_timer.start()
         # -------------
 
     def __enter__(self):
         return self
 
     def __exit__(self, *args):
-        self.manager.__exit__(*args)
+        # unblock the producers waiting for the UI
+        self.queue.close()
+        self.save_session()
+        if self.library is not None:
+            self.library.close()
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        self.thumbnails.stop()
+        self.staging.stop()
 
     def skip(self, diff_seconds):
-        """Skipp a few seconds (forward or back)"""
+        """Skipp a few seconds (forward or back), bursts of skips are merged into one seek"""
         # convert to ms
-        diff = int(diff_seconds * 1000)
-
-        current = self.vlcplayer.get_time()
-        new = max(current + diff, 0)
-        self.vlcplayer.set_time(new)
+        new = self.seeks.seek_by(int(diff_seconds * 1000))
+        self._flush_seek()
 
-        l = self.vlcplayer.get_length()
+        l = self.backend.get_length()
         if l > 0:
             pos = new / l
             self.position.setValue(pos * 1000)
 
-    def open_folder(self, folder):
-        self.base_folder = folder
-        self._async_action(open_folder.action, folder)
+    def _flush_seek(self):
+        self.seeks.flush()
+
+        delay = self.seeks.delay()
+        if delay is not None and not self.seek_timer.isActive():
+            self.seek_timer.start(int(delay * 1000) + 1)
+
+    def open_folder(self, folders):
+        """Open one or more folders, folders on different disks are scanned in parallel.
+        Playlist files (m3u, m3u8, jsonl) are loaded instead of scanned"""
+        self.base_folders = as_roots(folders)
+        self.session_file = session_file(self.base_folders)
+        self.identity_file = os.path.splitext(self.session_file)[0] + '.identities.json'
+        self.identities = IdentityIndex.load(self.identity_file)
+        self.restore_session()
+
+        playlist_files = [f for f in self.base_folders if is_playlist(f)]
+        folders = [f for f in self.base_folders if not is_playlist(f)]
+
+        # The playlist is reconciled once the import and the scan both ended
+        self.scanned = set()
+        self.scans = bool(playlist_files) + bool(folders)
+
+        # Keep the order of playlist files, folders are sorted by name
+        self.sort_playlist = bool(folders)
+        if playlist_files:
+            self._async_action(import_playlist.action, playlist_files)
+
+        # The library service does the scan for us
+        if not folders or self.library is not None:
+            return
+
+        # Rescan even if we restored a session, the results are reconciled with the playlist
+        self._async_action(open_folder.action, folders, per_device=self.per_device)
+
+    def export_playlist(self, file=None):
+        """Save the playlist in its current order, the file is written in the background"""
+        if file is None:
+            file, _ = QtWidgets.QFileDialog.getSaveFileName(
+                self, 'Export Playlist', '', 'Playlists (*.m3u8 *.m3u *.jsonl)')
+
+        if not file:
+            return
+
+        rows = (self.playlist.item(i).text() for i in range(self.playlist.count()))
+        items = [(name, self.names[name]) for name in rows if name in self.names]
+        Process(target=playlists.write, args=(file, items)).start()
+
+    def connect_library(self, address):
+        """Use a shared library service instead of scanning the folders ourselves"""
+        self.library = daemon.LibraryClient(address)
+        self.library.subscribe(daemon.forward_changes(self.queue))
+
+    #
+    #   Session
+    #
+    def save_session(self):
+        """Save the playlist and the play state so the next start is instant"""
+        if self.session_file is None or not self.names:
+            return
+
+        rows = (self.playlist.item(i).text() for i in range(self.playlist.count()))
+        items = [(name, self.names[name]) for name in rows if name in self.names]
+
+        session = Session.capture(
+            self.auto_play,
+            items,
+            filter=self.search.text(),
+            position=max(self.backend.get_position(), 0.0),
+            roots=self.base_folders,
+        )
+        write(self.session_file, session)
+        self.identities.save(self.identity_file)
+
+    @metrics.timed('player.restore_session')
+    def restore_session(self):
+        """Show the playlist of the previous run and resume the item that was playing"""
+        session = load(self.session_file)
+
+        if session is None or not session.items:
+            return
+
+        self.playlist.setUpdatesEnabled(False)
+        for name, path in session.items:
+            self.names[name] = path
+            item = QtWidgets.QListWidgetItem(name)
+            self.playlist_items.append(item)
+            self.playlist.addItem(item)
+        self.playlist.setUpdatesEnabled(True)
+        self.search_index.add_many(session.items)
+
+        session.restore(self.auto_play)
+        self.restored_names = set(self.names)
+
+        if session.filter:
+            self.search.blockSignals(True)
+            self.search.setText(session.filter)
+            self.search.blockSignals(False)
+
+            if session.filter.startswith('?'):
+                self.filter_playlist(session.filter)
+            else:
+                visible = set(search(session.filter, self.names))
+                for item in self.playlist_items:
+                    item.setHidden(item.text() not in visible)
+
+        self.restored = True
+        print(f'Restored {len(session.items)} items')
+
+        if self.auto_play.history:
+            self.play_file(self.names[self.auto_play.current()], position=session.position)
+
+    def _reconcile_scan(self):
+        """Match the restored items that the scan did not find with the new ones.
+
+        Moved files keep their place in the history and their stats,
+        the others are removed.
+        """
+        missing = {name for name in self.names if name not in self.scanned}
+        added = [name for name in self.scanned if name not in self.restored_names]
+
+        if missing and added:
+            paths = {self.names[name]: name for name in missing}
+            paths.update((self.names[name], name) for name in added)
+
+            moves = self.identities.reconcile([self.names[n] for n in missing], [self.names[n] for n in added])
+
+            for old, new in moves:
+                self._moved(paths[old], paths[new])
+                missing.discard(paths[old])
+
+            print(f'Found {len(moves)} moved items')
+
+        if missing:
+            self._remove_items(missing)
+            print(f'Removed {len(missing)} missing items')
+
+    def _moved(self, old, new):
+        """A file was moved or renamed, the new item takes the place of the old one"""
+        if old not in self.names or old == new:
+            return
+
+        self.auto_play.rename(old, new)
+        self.search_index.move(self.names[old], self.names[new], new)
+        self._remove_items({old})
+
+    def _track_identities(self):
+        """Record the identity of the new files in the background"""
+        paths = [path for path in self.names.values() if self.identities.get(path) is None]
+        Process(target=self.identities.track_many, args=(paths,)).start()
+
+    def _remove_items(self, missing):
+
+        for item in self.playlist_items:
+            if item.text() in missing:
+                self.playlist.takeItem(self.playlist.row(item))
+
+        self.playlist_items = [item for item in self.playlist_items if item.text() not in missing]
+
+        for name in missing:
+            path = self.names.pop(name, None)
+            self.auto_play.remove(name)
+
+            if path is not None:
+                self.search_index.remove(path)
 
     def play_playlist_item(self, item):
         name = item.text()
@@ -100,6 +322,7 @@ class Player(QtWidgets.QMainWindow):
 
     def _playlist(self):
         playlist = QtWidgets.QListWidget()
+        playlist.setIconSize(QtCore.QSize(64, 36))
         playlist.itemDoubleClicked.connect(self.play_playlist_item)
         playlist.itemActivated.connect(self.play_playlist_item)
         return playlist
@@ -140,24 +363,36 @@ class Player(QtWidgets.QMainWindow):
         for item in self.playlist_items:
             item.setHidden(False)
 
+    @metrics.timed('player.filter_playlist')
     def filter_playlist(self, text):
         if text == '':
             self.remove_filter()
 
-        count = 0
-        all = self.playlist_items
-        selection = []
+        if text == '?':
+            return self.remove_filter()
 
-        for item in all:
-            contains = text.lower() in item.text().lower()
-            item.setHidden(not contains)
-            count += int(contains)
+        # the service is queried in the background, the answer is applied by _process_result
+        if self.library is not None:
+            return self._async_action(daemon.query_action, self.library, text)
 
-            if contains:
-                selection.append(item.text())
+        self._select(text, self._local_filter(text))
+
+    def _local_filter(self, text):
+        if text.startswith('?'):
+            # full text query on the names, folders, titles and tags, best matches first
+            return [name for name, _ in self.search_index.query(text[1:]) if name in self.names]
+
+        return search(text, [item.text() for item in self.playlist_items])
+
+    def _select(self, text, selection):
+        """Only show the selected items, auto play picks the next items from them"""
+        matches = set(selection)
+
+        for item in self.playlist_items:
+            item.setHidden(item.text() not in matches)
 
         self.auto_play.set_selection_set(selection)
-        print(f'{text} {count}')
+        print(f'{text} {len(selection)}')
 
     def _playlist_controls(self):
         play = QtWidgets.QPushButton('Play')
@@ -184,13 +419,13 @@ class Player(QtWidgets.QMainWindow):
         return controls
 
     def set_volume(self, value):
-        self.vlcplayer.audio_set_volume(value)
+        self.backend.set_volume(value)
 
     def _volume_slider(self):
         slider = QtWidgets.QSlider(QtCore.Qt.Horizontal, self)
         slider.setToolTip("Volume")
         slider.setMaximum(100)
-        slider.setValue(self.vlcplayer.audio_get_volume())
+        slider.setValue(self.backend.get_volume())
         slider.valueChanged.connect(self.set_volume)
         return slider
 
@@ -200,7 +435,8 @@ class Player(QtWidgets.QMainWindow):
         else:
             self.position.setValue(value)
 
-        self.vlcplayer.set_position(value / 1000.0)
+        self.seeks.cancel()
+        self.backend.set_position(value / 1000.0)
 
     def _position_slider(self):
         slider = QtWidgets.QSlider(QtCore.Qt.Horizontal, self)
@@ -210,43 +446,119 @@ class Player(QtWidgets.QMainWindow):
         slider.sliderPressed.connect(self.set_position)
         return slider
 
-    def play_file(self, file):
-        """Play a file"""
-        self.media = self.instance.media_new(file)
-        self.vlcplayer.set_media(self.media)
-        self.media.parse()
-
-        self.setWindowTitle(self.media.get_meta(vlc.Meta.Title))
+    @metrics.timed('player.play_file')
+    def play_file(self, file, position=None):
+        """Play a file, from ``position`` (fraction of its length) if given"""
+        self._play_id += 1
+        self.resume_position = position
         self.position.setValue(0)
-        self.vlcplayer.play()
-
-        # video_take_snapshot
-        print(
-            self.vlcplayer.video_get_size(),
-            self.vlcplayer.get_fps(),
-            self.vlcplayer.get_length(),
-            self.vlcplayer.get_time(),
-            self.vlcplayer.is_seekable(),
-        )
+        Process(target=self.identities.record_access, args=(file,)).start()
+
+        title = self.backend.open(file)
+        self.seeks.open(file)
+
+        if title:
+            self.search_index.set_title(file, title)
+        self.setWindowTitle(title or os.path.basename(file))
 
     def _update_frame(self):
-        if sys.platform.startswith('linux'):
-            self.vlcplayer.set_xwindow(self.videoframe.winId())
-        elif sys.platform == "win32":
-            self.vlcplayer.set_hwnd(self.videoframe.winId())
-        elif sys.platform == "darwin":
-            self.vlcplayer.set_nsobject(int(videoframe.winId()))
+        self.backend.set_window(self.videoframe.winId())
+
+    def _on_media_event(self, event, value):
+        if self.resume_position is not None and (event == POSITION or (event == STATE and value == PLAYING)):
+            position, self.resume_position = self.resume_position, None
+            self.backend.set_position(position)
+
+        if event == POSITION:
+            self._show_position(value)
+
+        elif event == END:
+            self._media_ended()
+
+        elif event == ERROR:
+            print(f'Playback error: {value}')
+            self._media_ended()
 
+    def _show_position(self, position):
+        value = int(position * 1000)
+
+        # only touch the widget when the value changed, a pending seek already moved it
+        if value != self.position.value() and not self.position.isSliderDown() and self.seeks.pending is None:
+            self.position.setValue(value)
+
+    def _media_ended(self):
+        # the end event and the timer fallback can both see the same end
+        if self._ended_id == self._play_id:
+            return
+
+        self._ended_id = self._play_id
+        self.next_item()
+
+    @metrics.timed('player.update_ui')
     def _update_ui(self):
-        self._process_async_work()
+        busy = self._process_async_work()
 
-        if self.vlcplayer.is_playing():
-            media_pos = int(self.vlcplayer.get_position() * 1000)
-            self.position.setValue(media_pos)
+        # Poll faster while there are results to process
+        self.timer.setInterval(self.BUSY_INTERVAL if busy else self.IDLE_INTERVAL)
 
-        state = self.vlcplayer.get_state()
-        if state == vlc.State.Ended:
-            self.next_item()
+        if self.watchdog is not None:
+            self.watchdog.heartbeat(self.timer.interval() / 1000)
+
+        # Fallback in case an event was missed
+        if self.backend.get_state() == ENDED:
+            self._media_ended()
+
+    #
+    #   Thumbnails
+    #
+    def _visible_items(self):
+        viewport = self.playlist.viewport().rect()
+        first = self.playlist.indexAt(viewport.topLeft()).row()
+        last = self.playlist.indexAt(viewport.bottomLeft()).row()
+
+        if first < 0:
+            return []
+
+        if last < 0:
+            last = self.playlist.count() - 1
+
+        items = [self.playlist.item(i) for i in range(first, last + 1)]
+        return [item for item in items if not item.isHidden()]
+
+    def _refresh_thumbnails(self, *args):
+        """Show the thumbnails of the visible rows, generate the missing ones"""
+        visible = dict()
+
+        for item in self._visible_items():
+            path = self.names.get(item.text())
+            if path is None:
+                continue
+
+            visible[path] = item
+            icon = self.thumbnail_icons.get(path)
+
+            if icon is not None:
+                item.setIcon(icon)
+            else:
+                self.thumbnails.request(path)
+
+        # Drop the decoded images of rows that are not visible anymore
+        for path, item in self.thumbnail_items.items():
+            if path not in visible:
+                item.setIcon(QtGui.QIcon())
+
+        self.thumbnail_items = visible
+
+    def _set_thumbnail(self, path, frames):
+        if not frames:
+            return
+
+        icon = QtGui.QIcon(frames[0])
+        self.thumbnail_icons.put(path, icon)
+
+        item = self.thumbnail_items.get(path)
+        if item is not None:
+            item.setIcon(icon)
 
     #
     #   Shortcuts
@@ -255,10 +567,19 @@ class Player(QtWidgets.QMainWindow):
         file = self.auto_play.current()
         self.next_item()
 
-        path = self.names.pop(file)
-        self.auto_play.remove(file)
+        path = self.names[file]
+        self._remove_items({file})
+
+        # Playlist entries can live anywhere, stage them next to the file
+        root = find_root(path, self.base_folders) or os.path.dirname(path)
+        batch = self.staging.delete(root, [path])
+        self.deleted.append((root, batch))
+        self.deleted_names[batch] = {path: file}
 
-        self._async_action(delete_file.action, self.base_folder, path)
+    def undo_delete(self):
+        """Restore the last deleted files"""
+        if self.deleted:
+            self.staging.undo(*self.deleted.pop())
 
     def forward_long(self):
         """Forward 10 sec"""
@@ -278,7 +599,7 @@ class Player(QtWidgets.QMainWindow):
 
     def toggle_play_pause(self):
         """Pause play the video"""
-        self.vlcplayer.pause()
+        self.backend.pause()
 
     def next_item(self):
         """Play next item"""
@@ -293,7 +614,7 @@ class Player(QtWidgets.QMainWindow):
             self.play_file(item)
 
     def _test_action(self):
-        self._async_action(check_duplicates.action, self.base_folder)
+        self._async_action(check_duplicates.action, self.base_folders, per_device=self.per_device)
 
     def _shortcuts(self):
         shortcuts = [
@@ -305,7 +626,9 @@ class Player(QtWidgets.QMainWindow):
             ("a", self.prev_item),
             ("d", self.next_item),
             ('Delete', self.delete_file),
-            ('c', self._test_action)
+            ('ctrl+z', self.undo_delete),
+            ('c', self._test_action),
+            ('ctrl+s', self.export_playlist),
         ]
 
         for k, v in shortcuts:
@@ -325,21 +648,36 @@ class Player(QtWidgets.QMainWindow):
         except Empty:
             return None
 
+    @metrics.timed('player.process_async_work')
     def _process_async_work(self):
+        """Process the results of the actions, returns True if there was any"""
         # Limit time we can spend handling results in a single tick
         # this is to avoid locking UI
         start = time.time()
+        processed = 0
 
+        busy = True
         while time.time() - start < 0.1:
             item = self._get_result()
 
             if item is None:
-                return
+                busy = processed > 0
+                break
 
             self._process_result(*item)
+            processed += 1
+            metrics.inc('player.results')
+
+        # rank the new items once per tick instead of once per item
+        if self.query_stale:
+            self.query_stale = False
+            self.filter_playlist(self.search.text())
+
+        return busy
 
     def _add_playlist_item(self, file, path):
         self.names[file] = path
+        self.search_index.add(file, path)
 
         item = QtWidgets.QListWidgetItem(file)
 
@@ -347,8 +685,15 @@ class Player(QtWidgets.QMainWindow):
         self.playlist.addItem(item)
 
         # Check if we have a filter on the playlist
-        if self.search and self.search.text() != "":
-            valid = self.search.text().lower() in file.lower()
+        text = self.search.text() if self.search else ''
+
+        if text.startswith('?') and text != '?':
+            # full text queries need the index, the query runs again at the end of the tick
+            item.setHidden(True)
+            self.query_stale = True
+
+        elif text not in ('', '?'):
+            valid = text.lower() in file.lower()
             item.setHidden(not valid)
 
             if valid:
@@ -356,25 +701,93 @@ class Player(QtWidgets.QMainWindow):
         else:
             self.auto_play.add_to_selection(file)
 
+    def _add_scanned(self, file, path):
+        if self.names.get(file, path) != path and file in self.scanned:
+            # another file found by this scan has the same name, a playlist and a folder can both have it
+            file = path
+
+        self.scanned.add(file)
+
+        if file in self.names:
+            # Already restored from the session, it might have moved to another folder
+            previous = self.names[file]
+
+            if previous != path:
+                self.identities.move(previous, path)
+                self.search_index.move(previous, path, file)
+                self.names[file] = path
+            return
+
+        self._add_playlist_item(file, path)
+
+        # wait for a bit before playing the item
+        # so it does not always start on the same file
+        if not self.restored and len(self.names) == 1000:
+            self.auto_play.reset()
+            self.next_item()
+
     def _process_result(self, action, *args):
+        if action == thumbnails.RESULT:
+            self._set_thumbnail(*args)
+
+        if action == thumbnails.ERROR:
+            path, error = args
+            print(f'No thumbnail for {path}: {error}')
+
+        if action == RESTORED:
+            batch, paths = args
+            names = self.deleted_names.pop(batch, dict())
+            for path in paths:
+                self._add_playlist_item(names.get(path, os.path.basename(path)), path)
+
         if action == open_folder.START:
             print(f'Looking for items')
 
-        if action == open_folder.RESULT:
-            file, path = args
-            self._add_playlist_item(file, path)
+        if action == daemon.QUERY:
+            text, items, error = args
+
+            # answers to older queries are dropped
+            if self.search is not None and text == self.search.text():
+                if error is not None:
+                    print(f'Library query failed, filtering locally: {error}')
+                    self._select(text, self._local_filter(text))
+                else:
+                    self._select(text, [name for name, _ in items if name in self.names])
+
+        if action == daemon.REMOVE:
+            name, path = args
+            if self.names.get(name) == path:
+                self._remove_items({name})
+
+        if action == daemon.MOVE:
+            name, path, previous = args
+            old = [n for n, p in self.names.items() if p == previous]
+            if old:
+                self._moved(old[0], name)
+
+        if action in (open_folder.RESULT, daemon.RESULT):
+            self._add_scanned(*args)
+
+        if action == open_folder.BATCH:
+            batch, = args
+            for file, path in batch:
+                self._add_scanned(file, path)
+
+        if action in (open_folder.END, daemon.READY):
+            self.scans = max(self.scans - 1, 0)
+            if self.scans > 0:
+                return
 
-            # wait for a bit before playing the item
-            # so it does not always start on the same file
-            if len(self.names) == 1000:
-                self.auto_play.reset()
-                self.next_item()
+            if self.restored:
+                self._reconcile_scan()
 
-        if action == open_folder.END:
             print(f'Found {len(self.names)} inside the folder')
-            self.playlist.sortItems()
+            if self.sort_playlist:
+                self.playlist.sortItems()
+            self._track_identities()
+            self._refresh_thumbnails()
 
-            if len(self.names) < 1000:
+            if not self.restored and len(self.names) < 1000:
                 self.next_item()
 
 
@@ -402,16 +815,41 @@ def main():
     import argparse
 
     parser = argparse.ArgumentParser()
-    parser.add_argument('folder', type=str, default='.', help="Playlist folder to open")
+    parser.add_argument('folder', type=str, nargs='+', help="Playlist folders or playlist files (m3u, m3u8, jsonl) to open")
+    parser.add_argument('--per-device', type=int, default=1, help="Concurrent scan jobs per disk")
+    parser.add_argument('--library', type=str, default=None, help="host:port of a shared library service (player-library)")
+    parser.add_argument('--stalls', type=str, default=None, help="Sample the UI thread when it stalls and save the stacks to this file")
+    parser.add_argument('--stall-threshold', type=float, default=0.5, help="Seconds the UI can be late before it is considered stalled")
+    parser.add_argument('--stall-interval', type=float, default=0.01, help="Seconds between two stack samples during a stall")
+    parser.add_argument('--metrics', type=str, default=None, help="Save a Chrome trace to this file, stats are dumped next to it")
 
     app = QtWidgets.QApplication(sys.argv)
     set_style(app)
 
+    args = parser.parse_args()
+
+    dumper = None
+    if args.metrics:
+        metrics.enable()
+        dumper = StatsDumper(metrics, f'{args.metrics}.stats.json').start()
+
     with Player() as player:
         player.show()
         player.resize(1280, 720)
 
-        args = parser.parse_args()
+        player.per_device = args.per_device
+        if args.stalls:
+            player.watchdog = StallWatchdog(args.stalls, args.stall_threshold, args.stall_interval).start()
+
+        if args.library:
+            player.connect_library(daemon.parse_address(args.library))
+
         player.open_folder(args.folder)
 
-        sys.exit(app.exec_())
\ No newline at end of file
+        code = app.exec_()
+
+    if dumper is not None:
+        dumper.stop()
+        metrics.write_trace(args.metrics)
+
+    sys.exit(code)
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""Streaming playlist readers and writers (M3U, M3U8 and JSON lines)
+
+Readers yield batches of ``(name, path)`` so a large playlist is never fully
+loaded in memory, writers consume any iterable of ``(name, path)``.
+
+>>> import io
+>>> out = io.StringIO()
+>>> write_m3u(out, [('Movie', '/videos/movie.mkv')])
+1
+>>> print(out.getvalue(), end='')
+#EXTM3U
+#EXTINF:-1,Movie
+/videos/movie.mkv
+>>> list(parse_m3u(io.StringIO(out.getvalue()), '/'))
+[[('Movie', '/videos/movie.mkv')]]
+"""
+import json
+import os
+
+
+def _batches(entries, batch_size):
+    batch = []
+
+    for entry in entries:
+        batch.append(entry)
+
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def _m3u_entries(lines, folder):
+    title = None
+
+    for line in lines:
+        line = line.strip()
+
+        if not line:
+            continue
+
+        if line.startswith('#EXTINF:'):
+            _, _, title = line.partition(',')
+            continue
+
+        if line.startswith('#'):
+            continue
+
+        path = line
+        if '://' not in path and not os.path.isabs(path):
+            path = os.path.normpath(os.path.join(folder, path))
+
+        yield (title or os.path.basename(path), path)
+        title = None
+
+
+def parse_m3u(lines, folder, batch_size=1000):
+    """Parse M3U lines, relative paths are relative to ``folder``"""
+    return _batches(_m3u_entries(lines, folder), batch_size)
+
+
+def parse_jsonl(lines, batch_size=1000):
+    def entries():
+        for line in lines:
+            if line.strip():
+                data = json.loads(line)
+                yield (data.get('name') or os.path.basename(data['path']), data['path'])
+
+    return _batches(entries(), batch_size)
+
+
+def write_m3u(out, entries):
+    """Write an extended M3U playlist, returns the number of entries"""
+    count = 0
+    out.write('#EXTM3U\n')
+
+    for name, path in entries:
+        out.write(f'#EXTINF:-1,{name}\n{path}\n')
+        count += 1
+
+    return count
+
+
+def write_jsonl(out, entries):
+    count = 0
+
+    for name, path in entries:
+        out.write(json.dumps(dict(name=name, path=path)))
+        out.write('\n')
+        count += 1
+
+    return count
+
+
+READERS = {
+    '.m3u': 'm3u',
+    '.m3u8': 'm3u',
+    '.jsonl': 'jsonl',
+}
+
+
+def is_playlist(path):
+    return os.path.isfile(path) and os.path.splitext(path)[1].lower() in READERS
+
+
+def read(path, batch_size=1000):
+    """Yield batches of ``(name, path)`` from a playlist file"""
+    kind = READERS.get(os.path.splitext(path)[1].lower())
+
+    if kind is None:
+        raise ValueError(f'Unknown playlist format {path}')
+
+    with open(path, 'r', encoding='utf-8', errors='surrogateescape') as f:
+        if kind == 'm3u':
+            yield from parse_m3u(f, os.path.dirname(os.path.abspath(path)), batch_size)
+        else:
+            yield from parse_jsonl(f, batch_size)
+
+
+def write(path, entries):
+    """Write a playlist file, the format is picked from the extension"""
+    kind = READERS.get(os.path.splitext(path)[1].lower())
+
+    if kind is None:
+        raise ValueError(f'Unknown playlist format {path}')
+
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8', errors='surrogateescape') as f:
+        count = write_m3u(f, entries) if kind == 'm3u' else write_jsonl(f, entries)
+    os.replace(tmp, path)
+    return count
@@ -46,10 +46,22 @@ class PlaylistAutoPlay:
 
     def remove(self, item):
         """Remove an item from the history because it was removed from the playlist"""
-        try:
-            self.history.remove(item)
-        except:
-            pass
+        for items in (self.history, self.remains, self.next_items, self.selected or []):
+            try:
+                items.remove(item)
+            except ValueError:
+                pass
+
+    def rename(self, old, new):
+        """An item was moved or renamed, it keeps its place in the history"""
+        lists = (self.history, self.remains, self.next_items, self.selected or [])
+
+        if not any(old in items for items in lists):
+            return
+
+        # the new item takes the state of the old one
+        for items in lists:
+            items[:] = [new if item == old else item for item in items if item != new]
 
     def current(self):
         """Get current item that is playing"""
@@ -0,0 +1,230 @@
+"""Full text search over the file names, folders, media titles and tags (SQLite FTS5)
+
+Queries are words matched as prefixes, ``"quoted phrases"`` and
+``column:word`` to only look in one of ``name``, ``folders``, ``title`` or ``tags``.
+Results are ranked with bm25, a match in the name counts more than a match in a folder.
+
+>>> index = SearchIndex()
+>>> index.add('Night of the Living Dead.mkv', '/videos/horror/Night of the Living Dead.mkv')
+>>> index.add('Dead Calm.mkv', '/videos/thriller/Dead Calm.mkv')
+>>> index.add('Nightcrawler.mkv', '/videos/thriller/Nightcrawler.mkv')
+>>> [name for name, _ in index.query('nigh')]
+['Nightcrawler.mkv', 'Night of the Living Dead.mkv']
+>>> [name for name, _ in index.query('"living dead"')]
+['Night of the Living Dead.mkv']
+>>> [name for name, _ in index.query('folders:thriller dead')]
+['Dead Calm.mkv']
+"""
+import os
+import re
+import sqlite3
+import threading
+
+from player.metrics import metrics
+
+
+COLUMNS = ('name', 'folders', 'title', 'tags')
+
+# bm25 weight of each column, in the order of COLUMNS
+WEIGHTS = (10.0, 1.0, 5.0, 3.0)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    tags TEXT NOT NULL DEFAULT ''
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5(name, folders, title, tags);
+"""
+
+TERM = re.compile(r'(?:(' + '|'.join(COLUMNS) + r'):)?(?:"([^"]*)"?|([^\s"]+))')
+
+
+def _quote(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def parse_query(text):
+    """Translate a search box query to an FTS5 query
+
+    >>> parse_query('nigh "living dead" tags:horror')
+    '"nigh"* "living dead" tags : "horror"*'
+    """
+    terms = []
+
+    for column, phrase, word in TERM.findall(text):
+        if word:
+            term = _quote(word) + '*'
+        elif phrase.strip():
+            term = _quote(phrase)
+        else:
+            continue
+
+        terms.append(f'{column} : {term}' if column else term)
+
+    return ' '.join(terms)
+
+
+def folders(path):
+    return ' '.join(os.path.dirname(path).split(os.sep))
+
+
+class SearchIndex:
+    """FTS5 index of the playlist, additions are buffered and written in batches
+
+    Parameters
+    ----------
+    path: str
+        database file, in memory by default
+
+    batch_size: int
+        number of buffered additions written in one transaction
+    """
+
+    def __init__(self, path=':memory:', batch_size=5000):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.batch_size = batch_size
+        self.pending = []
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        with self.lock:
+            self.flush()
+            return self.db.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self.db.close()
+
+    def add(self, name, path):
+        with self.lock:
+            self.pending.append((name, path))
+
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+
+    def add_many(self, items):
+        with self.lock:
+            self.pending.extend(items)
+            self.flush()
+
+    @metrics.timed('search.flush')
+    def flush(self):
+        """Write the buffered additions"""
+        with self.lock:
+            if not self.pending:
+                return
+
+            # the last name of a path wins
+            items = {path: name for name, path in self.pending}
+            self.pending = []
+
+            existing = dict()
+            paths = list(items)
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                existing.update(self.db.execute(
+                    f'SELECT path, id FROM documents WHERE path IN ({", ".join("?" * len(chunk))})', chunk))
+
+            # new documents get their ids here so the index rows can be inserted directly
+            next_id = (self.db.execute('SELECT MAX(id) FROM documents').fetchone()[0] or 0) + 1
+            new, updated = [], []
+
+            for path, name in items.items():
+                if path in existing:
+                    updated.append((name, folders(path), existing[path]))
+                else:
+                    new.append((next_id, path, name, folders(path)))
+                    next_id += 1
+
+            with self.db:
+                self.db.executemany('INSERT INTO documents(id, path, name) VALUES (?, ?, ?)', [d[:3] for d in new])
+                self.db.executemany(
+                    "INSERT INTO fts(rowid, name, folders, title, tags) VALUES (?, ?, ?, '', '')",
+                    [(i, name, f) for i, _, name, f in new])
+                self.db.executemany('UPDATE documents SET name = ? WHERE id = ?', [(n, i) for n, _, i in updated])
+                self.db.executemany('UPDATE fts SET name = ?, folders = ? WHERE rowid = ?', updated)
+
+            metrics.inc('search.documents', len(items))
+
+    def remove(self, path):
+        with self.lock:
+            self.flush()
+
+            with self.db:
+                self.db.execute('DELETE FROM fts WHERE rowid = (SELECT id FROM documents WHERE path = ?)', (path,))
+                self.db.execute('DELETE FROM documents WHERE path = ?', (path,))
+
+    def move(self, old, new, name=None):
+        """A file was moved or renamed, it keeps its title and tags"""
+        with self.lock:
+            self.flush()
+
+            row = self.db.execute('SELECT id, name FROM documents WHERE path = ?', (old,)).fetchone()
+            if row is None:
+                return
+
+            name = name or row[1]
+            with self.db:
+                # the new path might already be indexed by a scan
+                self.db.execute(
+                    'DELETE FROM fts WHERE rowid = (SELECT id FROM documents WHERE path = ? AND id != ?)', (new, row[0]))
+                self.db.execute('DELETE FROM documents WHERE path = ? AND id != ?', (new, row[0]))
+                self.db.execute('UPDATE documents SET path = ?, name = ? WHERE id = ?', (new, name, row[0]))
+                self.db.execute('UPDATE fts SET name = ?, folders = ? WHERE rowid = ?', (name, folders(new), row[0]))
+
+    def _update(self, path, column, value):
+        self.db.execute(f'UPDATE documents SET {column} = ? WHERE path = ?', (value, path))
+        self.db.execute(
+            f'UPDATE fts SET {column} = ? WHERE rowid = (SELECT id FROM documents WHERE path = ?)', (value, path))
+
+    def set_title(self, path, title):
+        """Media title found when the file was opened"""
+        with self.lock:
+            self.flush()
+
+            with self.db:
+                self._update(path, 'title', title or '')
+
+    def tags(self, path):
+        with self.lock:
+            self.flush()
+            row = self.db.execute('SELECT tags FROM documents WHERE path = ?', (path,)).fetchone()
+            return [t for t in row[0].split('\n') if t] if row else []
+
+    def tag(self, paths, tag, remove=False):
+        with self.lock:
+            self.flush()
+
+            with self.db:
+                for path in paths:
+                    tags = [t for t in self.tags(path) if t != tag]
+                    if not remove:
+                        tags.append(tag)
+                    self._update(path, 'tags', '\n'.join(tags))
+
+    def untag(self, paths, tag):
+        self.tag(paths, tag, remove=True)
+
+    @metrics.timed('search.query')
+    def query(self, text, limit=None):
+        """Best matches first, ``[(name, path)]``"""
+        match = parse_query(text)
+        if not match:
+            return []
+
+        with self.lock:
+            self.flush()
+
+            weights = ', '.join(str(w) for w in WEIGHTS)
+            rows = self.db.execute(
+                'SELECT documents.name, documents.path FROM fts '
+                'JOIN documents ON documents.id = fts.rowid '
+                f'WHERE fts MATCH ? ORDER BY bm25(fts, {weights}) LIMIT ?',
+                (match, -1 if limit is None else limit))
+
+            return rows.fetchall()
@@ -0,0 +1,190 @@
+"""Coalesce and rate limit seeks sent to the media backend
+
+Holding an arrow key sends a burst of small skips, seeking for each of them
+makes the decoder work through all of them one after another. The scheduler
+accumulates them into a single target and only seeks every ``min_interval``.
+
+>>> from player.media import FakeBackend
+>>> backend = FakeBackend()
+>>> backend.open('a.mkv')
+'a.mkv'
+>>> seeks = SeekScheduler(backend, min_interval=0.1, clock=lambda: 0)
+>>> seeks.seek_by(500), seeks.seek_by(500), seeks.seek_by(500)
+(500, 1000, 1500)
+>>> backend.seeks, backend.get_time()
+(1, 500)
+>>> seeks.flush(now=0.1)
+True
+>>> backend.seeks, backend.get_time()
+(2, 1500)
+"""
+from bisect import bisect_right, insort
+import threading
+import time
+
+from player.media import POSITION
+from player.thumbnails import MemoryLRU
+
+
+class KeyframeIndex:
+    """Sorted keyframe times (ms) of a file"""
+
+    def __init__(self, times=()):
+        self.times = sorted(set(times))
+
+    def __len__(self):
+        return len(self.times)
+
+    def add(self, time):
+        i = bisect_right(self.times, time)
+        if i == 0 or self.times[i - 1] != time:
+            insort(self.times, time)
+
+    def before(self, time):
+        """Last keyframe at or before ``time``, None if unknown"""
+        i = bisect_right(self.times, time)
+        return self.times[i - 1] if i > 0 else None
+
+    def snap(self, time, window):
+        """Move ``time`` to the keyframe before it if one is within ``window`` ms"""
+        keyframe = self.before(time)
+
+        if keyframe is not None and time - keyframe <= window:
+            return keyframe
+
+        return time
+
+
+class SeekScheduler:
+    """Merge pending seeks into one target and seek at most every ``min_interval`` seconds
+
+    Parameters
+    ----------
+    backend: MediaBackend
+        backend to seek, the scheduler listens to its position events
+        to learn where seeks land
+
+    min_interval: float
+        minimum time in seconds between two backend seeks
+
+    coarse: int
+        seeks of at least this many ms are snapped to a known keyframe
+
+    snap_window: int
+        maximum distance in ms between a target and the keyframe it is snapped to
+
+    files: int
+        number of files whose keyframe index is kept
+
+    tolerance: int
+        a coarse seek landing within this many ms of its target or of the
+        time before the seek does not teach a keyframe
+    """
+
+    def __init__(self, backend, min_interval=0.15, coarse=5000, snap_window=2000, files=64, tolerance=50,
+                 clock=time.monotonic):
+        self.backend = backend
+        self.min_interval = min_interval
+        self.coarse = coarse
+        self.snap_window = snap_window
+        self.tolerance = tolerance
+        self.clock = clock
+        self.indexes = MemoryLRU(files)
+        self.index = KeyframeIndex()
+        self.pending = None
+        self.last_seek = None
+        # (target, time before the seek) of the last coarse seek, read by the backend thread
+        self.requested = None
+        self.length = 0
+        self.lock = threading.Lock()
+        backend.add_listener(self._on_event)
+
+    def open(self, path):
+        """Drop pending seeks and select the keyframe index of the new file"""
+        self.pending = None
+        with self.lock:
+            self.requested = None
+        self.index = self.indexes.get(path)
+
+        if self.index is None:
+            self.index = KeyframeIndex(self.backend.get_keyframes() or ())
+            self.indexes.put(path, self.index)
+
+    def cancel(self):
+        self.pending = None
+
+    def target(self):
+        """Time the player will be at once the pending seek is done"""
+        if self.pending is not None:
+            return self.pending[0]
+        return self.backend.get_time()
+
+    def seek_by(self, delta):
+        """Skip ``delta`` ms from the pending target, returns the new target"""
+        return self.seek_to(self.target() + delta, coarse=abs(delta) >= self.coarse)
+
+    def seek_to(self, time, coarse=False):
+        length = self.backend.get_length()
+        if length > 0:
+            time = min(time, length)
+
+        time = max(int(time), 0)
+        coarse = coarse or (self.pending is not None and self.pending[1])
+        self.pending = (time, coarse)
+        self.flush()
+        return time
+
+    def delay(self, now=None):
+        """Seconds until the pending seek can be sent, None if there is nothing pending"""
+        if self.pending is None:
+            return None
+
+        if self.last_seek is None:
+            return 0
+
+        now = self.clock() if now is None else now
+        return max(self.min_interval - (now - self.last_seek), 0)
+
+    def flush(self, now=None):
+        """Send the pending seek if the rate limit allows it, returns True if it was sent"""
+        now = self.clock() if now is None else now
+
+        if self.delay(now) != 0:
+            return False
+
+        time, coarse = self.pending
+        self.pending = None
+        self.last_seek = now
+
+        if coarse:
+            time = self.index.snap(time, self.snap_window)
+
+        # only coarse seeks are fast seeks, they land on a keyframe instead of the target
+        with self.lock:
+            self.requested = (time, self.backend.get_time()) if coarse else None
+            self.length = self.backend.get_length()
+
+        self.backend.set_time(time, fast=coarse)
+        return True
+
+    def _on_event(self, event, value):
+        # Called from the backend thread, only look at the event value
+        if event != POSITION:
+            return
+
+        with self.lock:
+            if self.requested is None or self.length <= 0:
+                return
+
+            landed = int(round(value * self.length))
+            requested, before = self.requested
+
+            # still playing from where we were, the seek has not landed yet
+            if abs(landed - before) <= self.tolerance:
+                return
+
+            self.requested = None
+
+        # A seek that did not land where we asked for landed on a keyframe
+        if self.tolerance < requested - landed <= self.snap_window:
+            self.index.add(landed)
@@ -0,0 +1,245 @@
+import errno
+import os
+import queue as queues
+import shutil
+import threading
+import time
+import uuid
+
+import player.journal as journal
+from player.metrics import metrics
+
+
+DELETED = 'deleted'
+JOURNAL = 'journal.jsonl'
+
+
+def move(src, dst):
+    """Rename when possible, copy when the destination is on another device"""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+
+    try:
+        os.rename(src, dst)
+    except OSError as err:
+        if err.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
+
+class StagingArea:
+    """Staged deletes: files are moved to ``base/deleted`` keeping their relative path.
+
+    Every batch is recorded in a journal so it can be undone or purged later.
+    """
+
+    def __init__(self, base):
+        self.base = os.path.abspath(base)
+        self.folder = os.path.join(self.base, DELETED)
+        self.journal = os.path.join(self.folder, JOURNAL)
+
+    def target(self, path, taken=()):
+        """Location of a file inside the staging area"""
+        rel = os.path.relpath(os.path.abspath(path), self.base)
+
+        if rel.startswith(os.pardir) or os.path.isabs(rel):
+            raise ValueError(f'{path} is not inside {self.base}')
+
+        if rel.split(os.sep)[0] == DELETED:
+            raise ValueError(f'{path} is already staged')
+
+        dest = os.path.join(self.folder, rel)
+
+        # A file with the same path was already staged by another batch
+        count = 1
+        candidate = dest
+        while os.path.exists(candidate) or candidate in taken:
+            candidate = f'{dest}.{count}'
+            count += 1
+
+        return candidate
+
+    def stage(self, paths, batch=None):
+        """Move a batch of files into the staging area, returns ``(batch, moves)``"""
+        return self.stage_many([(batch or uuid.uuid4().hex, paths)])[0]
+
+    @metrics.timed('staging.stage')
+    def stage_many(self, batches):
+        """Stage several ``(batch, paths)`` with a single journal write, returns ``[(batch, moves)]``"""
+        now = time.time()
+        planned = set()
+        records = []
+        staged = []
+
+        for batch, paths in batches:
+            moves = []
+
+            for path in paths:
+                dest = self.target(path, planned)
+                planned.add(dest)
+                moves.append((os.path.abspath(path), dest))
+                records.append(dict(op='stage', batch=batch, src=moves[-1][0], dst=dest, time=now))
+
+            staged.append((batch, moves))
+
+        # Write the intent first, so a crash in the middle of the batch can still be undone
+        journal.append(self.journal, records)
+
+        results = []
+        for batch, moves in staged:
+            done = []
+
+            for src, dst in moves:
+                try:
+                    move(src, dst)
+                    done.append((src, dst))
+                except OSError as err:
+                    print(f'Could not delete {src}: {err}')
+
+            metrics.inc('staging.files', len(done))
+            results.append((batch, done))
+
+        return results
+
+    def batches(self):
+        """Replay the journal, returns the staged files of every live batch in order"""
+        batches = dict()
+
+        for record in journal.read(self.journal):
+            op = record['op']
+            batch = record['batch']
+
+            if op == 'stage':
+                batches.setdefault(batch, []).append((record['src'], record['dst']))
+            else:
+                batches.pop(batch, None)
+
+        return batches
+
+    def _select(self, batch, all):
+        batches = self.batches()
+
+        if all:
+            return list(batches.items())
+
+        if batch is None:
+            return list(batches.items())[-1:]
+
+        return [(batch, batches.get(batch, []))]
+
+    def undo(self, batch=None, all=False):
+        """Restore a batch (the last one by default) or every batch, returns the restored paths"""
+        restored = []
+
+        for name, moves in self._select(batch, all):
+            for src, dst in moves:
+                if not os.path.exists(dst) or os.path.exists(src):
+                    continue
+
+                move(dst, src)
+                restored.append(src)
+
+            journal.append(self.journal, [dict(op='undo', batch=name, time=time.time())])
+
+        return restored
+
+    def purge(self, batch=None, all=False):
+        """Permanently remove a batch (the last one by default) or every batch, returns the removed paths"""
+        removed = []
+
+        for name, moves in self._select(batch, all):
+            for src, dst in moves:
+                try:
+                    os.remove(dst)
+                    removed.append(dst)
+                except FileNotFoundError:
+                    pass
+
+            journal.append(self.journal, [dict(op='purge', batch=name, time=time.time())])
+
+        return removed
+
+
+NAMESPACE = 'DELETE'
+STAGED = f'{NAMESPACE}_STAGED'
+RESTORED = f'{NAMESPACE}_RESTORED'
+
+
+class StagingWorker:
+    """Single worker thread executing staged deletes.
+
+    Every delete is its own batch so it can be undone on its own, deletes submitted
+    while the worker is busy share a single journal write.
+    Results are pushed to ``queue`` as ``(STAGED, batch, moves)``
+    and ``(RESTORED, batch, paths)``.
+    """
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.pending = queues.Queue()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.pending.put(None)
+
+        if self.thread is not None:
+            self.thread.join()
+
+    def delete(self, base, paths):
+        """Schedule a delete, returns the batch id to give to :meth:`undo`"""
+        batch = uuid.uuid4().hex
+        self.pending.put(('stage', base, [(batch, list(paths))]))
+        return batch
+
+    def undo(self, base, batch=None):
+        """Restore a batch, the last one of ``base`` by default"""
+        self.pending.put(('undo', base, batch))
+
+    def _next_batch(self, first):
+        """Merge the deletes that are already waiting with the first one"""
+        op, base, batches = first
+        others = []
+
+        while op == 'stage':
+            try:
+                item = self.pending.get(block=False)
+            except queues.Empty:
+                break
+
+            if item is not None and item[0] == 'stage' and item[1] == base:
+                batches.extend(item[2])
+            else:
+                others.append(item)
+                break
+
+        return (op, base, batches), others
+
+    def _execute(self, op, base, arg):
+        area = StagingArea(base)
+
+        if op == 'stage':
+            for batch, moves in area.stage_many(arg):
+                self.queue.put((STAGED, batch, moves))
+        else:
+            self.queue.put((RESTORED, arg, area.undo(arg)))
+
+    def _run(self):
+        todo = []
+
+        while True:
+            item = todo.pop(0) if todo else self.pending.get()
+
+            if item is None:
+                break
+
+            item, others = self._next_batch(item)
+            todo.extend(others)
+
+            try:
+                self._execute(*item)
+            except Exception as err:
+                print(f'Staging failed: {err}')
@@ -0,0 +1,296 @@
+from collections import OrderedDict
+import os
+import queue as queues
+import tempfile
+import threading
+import time
+
+from player.actions.check_duplicates import sample_hash
+from player.metrics import metrics
+from player.paths import cache_dir
+
+
+NAMESPACE = 'THUMBNAIL'
+RESULT = f'{NAMESPACE}_ITEM'
+ERROR = f'{NAMESPACE}_ERROR'
+
+
+class FrameSource:
+    """Extract still frames from a video file.
+
+    Implementations return one encoded image (bytes) per requested position,
+    positions are fractions of the media length in ``[0, 1]``.
+    """
+
+    extension = '.png'
+
+    def extract(self, path, positions, width):
+        raise NotImplementedError()
+
+
+class VLCFrameSource(FrameSource):
+    """Extract frames with a dedicated, windowless VLC instance"""
+
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+        self._instance = None
+
+    def _vlc(self):
+        from player.media import import_vlc
+
+        vlc = import_vlc()
+        if self._instance is None:
+            self._instance = vlc.Instance('--intf=dummy', '--vout=dummy', '--no-audio')
+        return vlc
+
+    def _wait(self, cond):
+        start = time.time()
+        while not cond():
+            if time.time() - start > self.timeout:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def extract(self, path, positions, width):
+        vlc = self._vlc()
+        player = self._instance.media_player_new()
+        player.set_media(self._instance.media_new(path))
+        player.play()
+
+        frames = []
+        try:
+            if not self._wait(lambda: player.get_state() == vlc.State.Playing):
+                raise TimeoutError(f'{path} did not start playing')
+
+            player.pause()
+
+            with tempfile.TemporaryDirectory() as tmp:
+                for i, pos in enumerate(positions):
+                    player.set_position(pos)
+                    snapshot = os.path.join(tmp, f'{i}.png')
+
+                    if player.video_take_snapshot(0, snapshot, width, 0) != 0:
+                        raise RuntimeError(f'no snapshot of {path} at {pos:.2f}')
+
+                    if not self._wait(lambda: os.path.exists(snapshot)):
+                        raise TimeoutError(f'no snapshot of {path} at {pos:.2f}')
+
+                    with open(snapshot, 'rb') as f:
+                        frames.append(f.read())
+        finally:
+            player.stop()
+            player.release()
+
+        return frames
+
+
+class MemoryLRU:
+    """Small in-memory LRU used to keep decoded thumbnails of the visible rows"""
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.items = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, key, default=None):
+        if key not in self.items:
+            return default
+
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+
+        while len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+
+
+class ThumbnailCache:
+    """On-disk, content-addressed thumbnail cache with a size bound.
+
+    Entries are keyed by :func:`sample_hash` of the video so a moved or renamed
+    file keeps its thumbnails. When the cache grows over ``max_bytes`` the least
+    recently used entries are removed. Hits update the entry mtime so the
+    LRU order survives restarts.
+    """
+
+    def __init__(self, folder=None, max_bytes=512 * 1024 * 1024):
+        self.folder = folder or cache_dir('thumbnails')
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self._keys = dict()
+        self._load()
+
+    def _load(self):
+        found = []
+        for root, _, files in os.walk(self.folder):
+            for file in files:
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, file, stat.st_size))
+
+        for _, name, size in sorted(found):
+            self.entries[name] = size
+            self.size += size
+
+    def key(self, path):
+        """Content key of a video, memoized on (path, size, mtime)"""
+        stat = os.stat(path)
+        memo = (path, stat.st_size, stat.st_mtime)
+
+        key = self._keys.get(memo)
+        if key is None:
+            key = sample_hash(path)
+            self._keys[memo] = key
+        return key
+
+    def _path(self, name):
+        return os.path.join(self.folder, name[:2], name)
+
+    @staticmethod
+    def entry_name(key, index, extension='.png'):
+        return f'{key}_{index}{extension}'
+
+    def get(self, key, index=0, extension='.png'):
+        """Return the path of a cached frame or None"""
+        name = self.entry_name(key, index, extension)
+
+        with self.lock:
+            if name not in self.entries:
+                return None
+            self.entries.move_to_end(name)
+
+        path = self._path(name)
+        try:
+            os.utime(path)
+        except OSError:
+            with self.lock:
+                self.size -= self.entries.pop(name, 0)
+            return None
+        return path
+
+    def put(self, key, index, data, extension='.png'):
+        """Store a frame and evict old entries if needed"""
+        name = self.entry_name(key, index, extension)
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        with self.lock:
+            self.size -= self.entries.pop(name, 0)
+            self.entries[name] = len(data)
+            self.size += len(data)
+            self._evict()
+
+        return path
+
+    def _evict(self):
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            name, size = self.entries.popitem(last=False)
+            self.size -= size
+
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+
+def frame_positions(count):
+    """Spread ``count`` frames evenly, skipping the very start and end"""
+    return [(i + 1) / (count + 1) for i in range(count)]
+
+
+class ThumbnailGenerator:
+    """Background worker that fills a :class:`ThumbnailCache`.
+
+    Requests are served last in first out, so the rows the user scrolled to
+    most recently are generated first. Results are pushed to ``queue`` as
+    ``(RESULT, path, [frame paths])``. Files that failed are not retried.
+    """
+
+    def __init__(self, queue, cache=None, source=None, frames=1, width=160):
+        self.queue = queue
+        self.cache = cache or ThumbnailCache()
+        self.source = source or VLCFrameSource()
+        self.frames = frames
+        self.width = width
+        self.pending = queues.LifoQueue()
+        self.requested = set()
+        self.failed = MemoryLRU(4096)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.pending.put(None)
+
+        if self.thread is not None:
+            self.thread.join()
+
+    def request(self, path):
+        """Schedule the generation of the thumbnails of a file"""
+        with self.lock:
+            if path in self.requested or path in self.failed:
+                return
+            self.requested.add(path)
+
+        self.pending.put(path)
+
+    @metrics.timed('thumbnails.generate')
+    def generate(self, path):
+        """Generate (or fetch from cache) the thumbnails of a file"""
+        key = self.cache.key(path)
+        ext = self.source.extension
+
+        cached = [self.cache.get(key, i, ext) for i in range(self.frames)]
+        if all(cached):
+            return cached
+
+        metrics.inc('thumbnails.extracted')
+        frames = self.source.extract(path, frame_positions(self.frames), self.width)
+
+        # a partial result would be extracted again on every request
+        if len(frames) < self.frames:
+            raise RuntimeError(f'{len(frames)} of {self.frames} frames extracted')
+
+        return [self.cache.put(key, i, data, ext) for i, data in enumerate(frames)]
+
+    def _run(self):
+        while self.running:
+            path = self.pending.get()
+
+            if path is None:
+                break
+
+            try:
+                self.queue.put((RESULT, path, self.generate(path)))
+            except Exception as err:
+                with self.lock:
+                    self.failed.put(path, str(err))
+                self.queue.put((ERROR, path, str(err)))
+            finally:
+                with self.lock:
+                    self.requested.discard(path)
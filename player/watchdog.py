@@ -0,0 +1,120 @@
+"""Detect when the UI thread stops servicing its timer and record what it is doing
+
+While the UI thread is stalled its stack is sampled every ``interval`` seconds,
+the samples are written in the collapsed stack format used by flamegraph.pl
+and speedscope (``frame;frame;frame count`` per line).
+"""
+from collections import Counter
+import os
+import sys
+import threading
+import time
+
+from player.metrics import metrics
+
+
+def collapse(frame, max_depth=64):
+    """Collapsed stack of a frame, the outermost call first"""
+    names = []
+
+    while frame is not None and len(names) < max_depth:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+        frame = frame.f_back
+
+    return ';'.join(reversed(names))
+
+
+class StallWatchdog:
+    """Watch the heartbeats of a thread and sample its stack when they stop
+
+    Parameters
+    ----------
+    path: str
+        collapsed stack report, rewritten at the end of each stall
+
+    threshold: float
+        a heartbeat later than expected by this many seconds is a stall
+
+    interval: float
+        seconds between two stack samples during a stall, lower is more precise
+        but takes the GIL from the stalled thread more often
+
+    max_depth: int
+        maximum number of frames kept per sample
+
+    thread_id: int
+        thread to watch, the thread creating the watchdog by default
+    """
+
+    def __init__(self, path, threshold=0.5, interval=0.01, max_depth=64, thread_id=None, clock=time.monotonic):
+        self.path = path
+        self.threshold = threshold
+        self.interval = interval
+        self.max_depth = max_depth
+        self.thread_id = thread_id or threading.get_ident()
+        self.clock = clock
+        self.deadline = clock() + threshold
+        self.samples = Counter()
+        self.stalls = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def heartbeat(self, expected=0):
+        """The watched thread is alive, the next heartbeat is due in ``expected`` seconds"""
+        self.deadline = self.clock() + expected + self.threshold
+
+    def start(self):
+        self.heartbeat()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+        if self.thread is not None:
+            self.thread.join()
+
+        # Keep the samples of a stall that did not end
+        if self.samples:
+            self.write()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+
+        if frame is not None:
+            self.samples[collapse(frame, self.max_depth)] += 1
+
+    def write(self):
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        stall_start = None
+
+        while not self.stopped.is_set():
+            now = self.clock()
+            deadline = self.deadline
+
+            if now >= deadline:
+                if stall_start is None:
+                    stall_start = deadline - self.threshold
+                    print('UI thread is stalled, sampling its stack')
+
+                self.sample()
+                self.stopped.wait(self.interval)
+                continue
+
+            if stall_start is not None:
+                duration = now - stall_start
+                self.stalls += 1
+                metrics.observe('watchdog.stall', duration)
+                print(f'UI thread was stalled for {duration:.2f}s, stacks saved in {self.path}')
+                self.write()
+                stall_start = None
+
+            self.stopped.wait(min(deadline - now, self.threshold))
@@ -16,10 +16,13 @@ if __name__ == '__main__':
         entry_points={
             'console_scripts': [
                 'player = player.player:main',
+                'player-cli = player.cli:main',
+                'player-library = player.daemon:main',
             ],
         },
         packages=[
             'player',
+            'player.actions',
         ],
         setup_requires=['setuptools'],
     )
@@ -0,0 +1,17 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def touch():
+    """Create a file and its folders, returns its path"""
+
+    def touch(*parts, content=b'video'):
+        path = os.path.join(*parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    return touch
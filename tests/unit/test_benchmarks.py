@@ -0,0 +1,49 @@
+import os
+
+from benchmarks.__main__ import compare
+from benchmarks.synthetic import LibrarySpec, generate
+
+
+def listing(base):
+    return sorted(
+        os.path.relpath(os.path.join(root, f), base)
+        for root, _, files in os.walk(base) for f in files
+    )
+
+
+def test_generate_is_reproducible(tmp_path):
+    # more duplicates than regular videos, the sparse file must never be picked
+    spec = LibrarySpec(fanout=(2, 2), files=3, duplicates=20, sparse=1, sparse_size=1024 ** 3)
+
+    a = generate(str(tmp_path / 'a'), spec)
+    b = generate(str(tmp_path / 'b'), spec)
+
+    assert a['videos'] == 2 * 2 * 3 + 1
+    assert listing(str(tmp_path / 'a')) == listing(str(tmp_path / 'b'))
+
+    assert len(a['duplicates']) == 2 * 2 * 3
+    for original, copy in a['duplicates']:
+        assert 'sparse' not in original
+        with open(original, 'rb') as f1, open(copy, 'rb') as f2:
+            assert f1.read() == f2.read()
+
+    sparse = os.path.join(str(tmp_path / 'a'), 'sparse 0.mkv')
+    assert os.path.getsize(sparse) == 1024 ** 3
+
+
+def test_compare_flags_regressions():
+    baseline = dict(results=dict(a=dict(min=1.0), b=dict(min=1.0)))
+    current = dict(results=dict(a=dict(min=1.2), b=dict(min=2.0), c=dict(min=5.0)))
+
+    assert compare(current, baseline, 1.5) == [('b', 2.0)]
+
+
+def test_compare_is_scaled_and_ignores_noise():
+    baseline = dict(calibration=1.0, results=dict(a=dict(min=1.0), b=dict(min=0.001)))
+
+    # a machine twice as slow
+    slower = dict(calibration=2.0, results=dict(a=dict(min=2.5), b=dict(min=0.004)))
+    assert compare(slower, baseline, 1.5) == []
+
+    slower['results']['a']['min'] = 4.0
+    assert compare(slower, baseline, 1.5) == [('a', 2.0)]
@@ -0,0 +1,104 @@
+from queue import Empty, Full
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+from player.actions import open_folder
+from player.channel import BoundedChannel, message_size
+
+
+def test_fifo_and_empty():
+    channel = BoundedChannel()
+    channel.put(('A', 1))
+    channel.put(('B', 2))
+
+    assert channel.get(block=False) == ('A', 1)
+    assert channel.get(block=False) == ('B', 2)
+    assert channel.nbytes == 0
+
+    with pytest.raises(Empty):
+        channel.get(block=False)
+
+
+def test_full_channel_does_not_block_when_asked():
+    channel = BoundedChannel(max_bytes=message_size(('A', 'x' * 100)))
+    channel.put(('A', 'x' * 100))
+
+    with pytest.raises(Full):
+        channel.put(('A', 'y'), block=False)
+
+    with pytest.raises(Full):
+        channel.put(('A', 'y'), timeout=0.01)
+
+
+def test_oversized_message_is_accepted_when_empty():
+    channel = BoundedChannel(max_bytes=10)
+    assert channel.put(('A', 'x' * 100), block=False)
+
+
+def test_close_wakes_up_producers():
+    channel = BoundedChannel(max_bytes=10)
+    channel.put(('A', 'x' * 100))
+    results = []
+
+    producer = threading.Thread(target=lambda: results.append(channel.put(('A', 'y'))))
+    producer.start()
+    time.sleep(0.02)
+    channel.close()
+    producer.join(1)
+
+    assert results == [False]
+
+
+def test_coalesce_preserves_order():
+    channel = BoundedChannel(coalesce={'ITEM': 'BATCH'}, max_batch=2)
+    for i in range(5):
+        channel.put(('ITEM', i))
+    channel.put(('OTHER',))
+    channel.put(('ITEM', 5))
+
+    assert [channel.get(block=False) for _ in range(channel.qsize())] == [
+        ('BATCH', [(0,), (1,)]),
+        ('BATCH', [(2,), (3,)]),
+        ('ITEM', 4),
+        ('OTHER',),
+        ('ITEM', 5),
+    ]
+    assert channel.nbytes == 0
+
+
+def test_slow_consumer_bounds_memory():
+    """A scan much faster than the UI keeps the backlog within the budget"""
+    budget = 256 * 1024
+    channel = BoundedChannel(max_bytes=budget, coalesce={open_folder.RESULT: open_folder.BATCH})
+    count = 100000
+
+    def scan():
+        for i in range(count):
+            channel.put((open_folder.RESULT, f'video {i:07d}.mkv', f'/videos/folder {i % 100}/video {i:07d}.mkv'))
+        channel.put((open_folder.END,))
+
+    tracemalloc.start()
+    producer = threading.Thread(target=scan)
+    producer.start()
+
+    received = 0
+    while True:
+        message = channel.get()
+        if message[0] == open_folder.END:
+            break
+
+        # UI tick, a bit of work per message
+        received += len(message[1]) if message[0] == open_folder.BATCH else 1
+        time.sleep(0.0001)
+
+    producer.join()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert received == count
+    assert channel.peak_bytes <= budget
+    # the unbounded backlog would be well over 20MB
+    assert peak < 16 * budget
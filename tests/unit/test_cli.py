@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+
+from player.cli import main, parse_arguments
+
+
+def events(output):
+    return [json.loads(line) for line in output.splitlines() if line]
+
+
+def test_parse_arguments():
+    args, kwargs = parse_arguments(['/a', '/b', '--per-device=2', '--all', '--layout', 'flatten'])
+
+    assert args == ['/a', '/b']
+    assert kwargs == dict(per_device=2, all=True, layout='flatten')
+
+
+def test_list_actions(capsys):
+    assert main(['list']) == 0
+
+    names = [e['name'] for e in events(capsys.readouterr().out)]
+    assert 'open_folder' in names and 'check_duplicates' in names
+
+
+def test_run_action(tmp_path, capsys):
+    (tmp_path / 'a.mkv').write_bytes(b'')
+
+    assert main(['open_folder', str(tmp_path)]) == 0
+
+    output = events(capsys.readouterr().out)
+    assert [e['type'] for e in output if e['event'] == 'message'] == ['FOLDER_START', 'FOLDER_ITEM', 'FOLDER_END']
+    assert output[-1]['event'] == 'done' and output[-1]['success']
+
+
+def test_failing_action(capsys):
+    assert main(['open_folder']) == 1
+    assert events(capsys.readouterr().out)[-2]['event'] == 'error'
+
+
+def test_unknown_action(capsys):
+    assert main(['nope']) == 2
+
+
+def test_cli_does_not_import_qt():
+    # the cold start time is measured by the cli_cold_start benchmark
+    code = (
+        'import sys\n'
+        'import player.cli\n'
+        'player.cli.discover_commands()\n'
+        'print(sorted(m for m in ("PyQt5", "vlc") if m in sys.modules))\n'
+    )
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == '[]'
@@ -0,0 +1,171 @@
+import os
+import queue
+import threading
+import time
+
+import pytest
+
+from player.daemon import (
+    QUERY,
+    READY,
+    REMOVE,
+    RESULT,
+    LibraryClient,
+    LibraryError,
+    LibraryServer,
+    forward_changes,
+    query_action,
+)
+from player.library import FolderWatcher, Library
+
+
+def wait_for(cond, timeout=5):
+    start = time.time()
+    while not cond():
+        assert time.time() - start < timeout
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def library(tmp_path, touch):
+    base = str(tmp_path)
+    touch(base, 'a', 'first.mkv')
+    touch(base, 'b', 'second.mkv')
+    touch(base, 'b', 'second.srt')
+
+    server = LibraryServer([base], poll_interval=3600, push_interval=0.01).start()
+    client = LibraryClient(server.server_address)
+    wait_for(lambda: client.call('stats')['items'] == 2)
+
+    yield base, server, client
+
+    client.close()
+    server.stop()
+
+
+def test_query_and_tags(library):
+    base, server, client = library
+
+    assert [name for name, _ in client.query('SEC')] == ['second.mkv']
+
+    path = os.path.join(base, 'a', 'first.mkv')
+    client.call('tag', paths=[path], tag='favorite')
+    assert client.query(tags=['favorite']) == [('first.mkv', path)]
+    assert client.search('tags:fav') == [('first.mkv', path)]
+
+
+def test_query_action(library):
+    base, server, client = library
+    messages = queue.Queue()
+
+    query_action(messages, client, 'SEC')
+    query_action(messages, client, '?first')
+
+    path = os.path.join(base, 'a', 'first.mkv')
+    assert messages.get() == (QUERY, 'SEC', [('second.mkv', os.path.join(base, 'b', 'second.mkv'))], None)
+    assert messages.get() == (QUERY, '?first', [('first.mkv', path)], None)
+
+    # the service is gone, the error is sent instead of raised
+    server.stop()
+    client.close()
+    query_action(messages, client, 'SEC')
+
+    text, items, error = messages.get()[1:]
+    assert text == 'SEC' and items == [] and error
+
+
+def test_batch_and_errors(library):
+    base, server, client = library
+
+    ping, stats = client.batch([('ping', {}), ('stats', {})])
+    assert ping == 'pong' and stats['items'] == 2
+
+    with pytest.raises(LibraryError):
+        client.call('nope')
+
+    # The connection is reused
+    assert client.idle.qsize() == 1
+
+
+def test_hash_cache(library):
+    base, server, client = library
+
+    path = os.path.join(base, 'a', 'first.mkv')
+    digest = client.call('hash', paths=[path])[path]
+    assert server.library.hashes[path][1] == digest
+
+    # only the files of the library can be hashed
+    with pytest.raises(LibraryError):
+        client.call('hash', paths=[os.path.join(base, 'b', 'second.srt')])
+
+
+def test_subscribe_receives_changes(library, touch):
+    base, server, client = library
+    messages = queue.Queue()
+    client.subscribe(forward_changes(messages))
+
+    wait_for(lambda: any(m[0] == READY for m in list(messages.queue)))
+    names = sorted(m[1] for m in list(messages.queue) if m[0] == RESULT)
+    assert names == ['first.mkv', 'second.mkv']
+
+    os.remove(os.path.join(base, 'a', 'first.mkv'))
+    touch(base, 'c', 'third.mkv')
+    client.call('rescan')
+
+    wait_for(lambda: any(m[0] == REMOVE for m in list(messages.queue)))
+    wait_for(lambda: any(m[0] == RESULT and m[1] == 'third.mkv' for m in list(messages.queue)))
+
+
+def test_ready_waits_for_the_first_scan():
+    messages = queue.Queue()
+    callback = forward_changes(messages)
+
+    callback(dict(version=1, changes=[('add', 'a.mkv', '/videos/a.mkv', None)], scanned=False))
+    assert [m[0] for m in messages.queue] == [RESULT]
+
+    callback(dict(version=2, changes=[('add', 'b.mkv', '/videos/b.mkv', None)], scanned=True))
+    callback(dict(version=3, changes=[], scanned=True))
+    assert [m[0] for m in messages.queue] == [RESULT, RESULT, READY]
+
+
+def test_same_name_in_two_folders(tmp_path, touch):
+    base = str(tmp_path)
+    a = touch(base, 'a', 'video.mkv')
+    b = touch(base, 'b', 'video.mkv')
+
+    library = Library()
+    FolderWatcher(library, [base]).scan()
+
+    # the first one found keeps its name, the other one is named by its relative path
+    items = dict(library.query())
+    assert sorted(items.values()) == [a, b]
+    assert sorted(items) in (['a/video.mkv', 'video.mkv'], ['b/video.mkv', 'video.mkv'])
+
+
+def test_concurrent_polls(tmp_path, touch):
+    base = str(tmp_path)
+    library = Library()
+    watcher = FolderWatcher(library, [base])
+    watcher.scan()
+
+    errors = []
+
+    def poll():
+        try:
+            for _ in range(20):
+                watcher.poll()
+        except Exception as err:
+            errors.append(err)
+
+    threads = [threading.Thread(target=poll) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+
+    paths = [touch(base, f'd{i % 5}', f'{i}.mkv') for i in range(100)]
+
+    for thread in threads:
+        thread.join()
+    watcher.poll()
+
+    assert errors == []
+    assert sorted(library.items) == sorted(paths)
@@ -0,0 +1,106 @@
+import os
+import queue
+import threading
+import time
+
+from player.actions import check_duplicates, fingerprint, open_folder
+from player.devices import DeviceScheduler, as_roots, find_root
+from player.metrics import metrics
+
+
+def test_as_roots():
+    assert as_roots('a') == ['a']
+    assert as_roots(['a', 'b']) == ['a', 'b']
+
+
+def test_find_root(tmp_path):
+    a = str(tmp_path / 'a')
+    nested = str(tmp_path / 'a' / 'b')
+
+    assert find_root(os.path.join(nested, 'x.mkv'), [a, nested]) == nested
+    assert find_root(os.path.join(a, 'x.mkv'), [a, nested]) == a
+    assert find_root(str(tmp_path / 'ab' / 'x.mkv'), [a]) is None
+
+
+def test_scheduler_limits_per_device():
+    running = {'d1': 0, 'd2': 0}
+    peak = {'d1': 0, 'd2': 0}
+    lock = threading.Lock()
+
+    def job(item):
+        dev = item[0]
+        with lock:
+            running[dev] += 1
+            peak[dev] = max(peak[dev], running[dev])
+        time.sleep(0.01)
+        with lock:
+            running[dev] -= 1
+        return item
+
+    items = [('d1', i) for i in range(6)] + [('d2', i) for i in range(6)]
+    scheduler = DeviceScheduler(per_device=1, limits={'d2': 3})
+
+    results = list(scheduler.map(job, items, lambda item: item[0]))
+
+    assert sorted(results) == sorted(items)
+    assert peak['d1'] == 1
+    assert peak['d2'] > 1
+
+
+def test_actions_accept_multiple_roots(tmp_path, touch):
+    a = str(tmp_path / 'a')
+    b = str(tmp_path / 'b')
+    touch(a, 'x.mkv', content=b'same')
+    touch(b, 'sub', 'y.mkv', content=b'same')
+
+    results = queue.Queue()
+    open_folder.action(results, [a, b])
+    assert sorted(m[1] for m in results.queue if m[0] == open_folder.RESULT) == ['x.mkv', 'y.mkv']
+
+    check_duplicates.action(queue.Queue(), [a, b])
+
+    # The copy is staged inside its own root
+    assert os.path.exists(os.path.join(b, 'deleted', 'sub', 'y.mkv'))
+    assert os.path.exists(os.path.join(a, 'x.mkv'))
+
+
+def test_missing_roots_are_skipped(tmp_path, touch):
+    a = touch(str(tmp_path / 'a' / 'x.mkv'))
+    missing = str(tmp_path / 'missing')
+
+    results = queue.Queue()
+    open_folder.action(results, [missing, str(tmp_path / 'a')])
+    assert list(results.queue) == [(open_folder.START,), (open_folder.RESULT, 'x.mkv', a), (open_folder.END,)]
+
+    results = queue.Queue()
+    open_folder.action(results, missing)
+    assert list(results.queue) == [(open_folder.START,), (open_folder.END,)]
+
+
+def test_end_is_sent_when_the_scan_fails(tmp_path):
+    class Broken:
+        def walk(self, root):
+            raise RuntimeError('broken')
+
+    results = queue.Queue()
+    try:
+        open_folder.action(results, str(tmp_path), file_filter=Broken())
+    except RuntimeError:
+        pass
+
+    assert list(results.queue) == [(open_folder.START,), (open_folder.END,)]
+
+
+def test_check_duplicates_is_timed(tmp_path, touch):
+    touch(str(tmp_path / 'x.mkv'))
+    before = metrics.stats()['histograms'].get('action.check_duplicates', dict(count=0))['count']
+
+    metrics.enable()
+    try:
+        check_duplicates.action(queue.Queue(), str(tmp_path))
+        # shares list_files, it must not be counted as a check_duplicates run
+        fingerprint.action(queue.Queue(), str(tmp_path))
+    finally:
+        metrics.disable()
+
+    assert metrics.stats()['histograms']['action.check_duplicates']['count'] == before + 1
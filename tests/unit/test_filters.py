@@ -0,0 +1,47 @@
+import os
+import queue
+
+from player.actions import open_folder
+from player.filters import FileFilter
+
+
+def test_extensions_are_case_insensitive():
+    f = FileFilter(extensions=['.SRT', 'nfo'])
+
+    assert not f.accept('movie.srt', 'movie.srt')
+    assert not f.accept('movie.NFO', 'movie.NFO')
+    assert f.accept('movie.mkv', 'movie.mkv')
+    assert f.accept('nfo', 'nfo')
+
+
+def test_include_overrides_ignore():
+    f = FileFilter(ignore=['extras/*'], include=['extras/keep*'])
+
+    assert not f.accept('a.mkv', 'extras/a.mkv')
+    assert f.accept('keep.mkv', 'extras/keep.mkv')
+
+
+def test_walk_prunes_folders(tmp_path, touch):
+    base = str(tmp_path)
+    touch(base, 'a.mkv')
+    touch(base, 'a.srt')
+    touch(base, 'deleted', 'b.mkv')
+    touch(base, 'show', 'deleted', 'c.mkv')
+    touch(base, 'show', 'Samples', 'd.mkv')
+
+    f = FileFilter(prune=['deleted', '*/samples'])
+    found = sorted(os.path.relpath(path, base) for _, _, path in f.walk(base))
+
+    assert found == ['a.mkv', os.path.join('show', 'deleted', 'c.mkv')]
+
+
+def test_open_folder_uses_ignored_extensions(tmp_path, touch):
+    base = str(tmp_path)
+    touch(base, 'a.mkv')
+    touch(base, 'b.avi')
+
+    results = queue.Queue()
+    open_folder.action(results, base, ignored_extensions=['AVI'])
+
+    items = [m[1] for m in results.queue if m[0] == open_folder.RESULT]
+    assert items == ['a.mkv']
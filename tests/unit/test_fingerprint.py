@@ -0,0 +1,68 @@
+import os
+import queue
+import random
+
+from player.actions.check_duplicates import RESULT, SIMILAR
+from player.actions.fingerprint import (
+    LSHIndex,
+    action,
+    minhash,
+    sampled_chunks,
+    similarity,
+)
+
+
+def random_bytes(rng, size):
+    return rng.getrandbits(8 * size).to_bytes(size, 'little')
+
+
+def write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+def test_remux_is_similar(tmp_path):
+    rng = random.Random(0)
+    payload = random_bytes(rng, 512 * 1024)
+
+    original = write(tmp_path / 'a.mkv', b'MKV-HEADER' + payload)
+    remux = write(tmp_path / 'a.mp4', b'other container header' * 10 + payload[:100000] + b'x' * 50 + payload[100000:])
+    other = write(tmp_path / 'b.mkv', random_bytes(rng, 512 * 1024))
+
+    a = minhash(sampled_chunks(original))
+    b = minhash(sampled_chunks(remux))
+    c = minhash(sampled_chunks(other))
+
+    assert similarity(a, b) > 0.8
+    assert similarity(a, c) < 0.1
+
+
+def test_lsh_groups_only_similar():
+    index = LSHIndex(bands=4, rows=2)
+    index.add('a', [1, 2, 3, 4, 5, 6, 7, 8])
+    index.add('b', [1, 2, 3, 4, 5, 6, 0, 0])
+    index.add('c', [9, 9, 9, 9, 9, 9, 9, 9])
+    index.add('d', [None] * 8)
+
+    assert list(index.candidates()) == [('a', 'b')]
+    assert dict(index.groups(0.5)) == {'a': ['a', 'b']}
+
+
+def test_action_reports_similar(tmp_path):
+    rng = random.Random(1)
+    payload = random_bytes(rng, 256 * 1024)
+
+    write(tmp_path / 'a.mkv', b'A' + payload)
+    write(tmp_path / 'b.mp4', b'BB' + payload)
+    write(tmp_path / 'c.mkv', random_bytes(rng, 256 * 1024))
+
+    results = queue.Queue()
+    action(results, str(tmp_path))
+
+    groups = [m for m in results.queue if m[0] == RESULT]
+    assert len(groups) == 1
+
+    _, kind, _, files = groups[0]
+    assert kind == SIMILAR
+    assert [os.path.basename(f) for f in files] == ['a.mkv', 'b.mp4']
@@ -0,0 +1,97 @@
+import os
+import queue
+import shutil
+
+from player.actions import open_folder
+from player.identity import IdentityIndex
+from player.library import ADDED, MOVED, FolderWatcher, Library
+from player.random_play import PlaylistAutoPlay
+
+
+def test_rename_is_a_move(tmp_path, touch):
+    old = touch(str(tmp_path), 'a', 'old.mkv')
+    other = touch(str(tmp_path), 'other.mkv')
+
+    index = IdentityIndex()
+    index.track_many([old, other])
+    index.record_access(old)
+
+    new = os.path.join(str(tmp_path), 'b', 'new.mkv')
+    os.makedirs(os.path.dirname(new))
+    os.rename(old, new)
+
+    assert index.reconcile([old], [new]) == [(old, new)]
+    assert index.get(new).access_count == 1
+    assert index.get(old) is None
+
+
+def test_copy_matched_by_partial_hash(tmp_path, touch):
+    old = touch(str(tmp_path), 'old.mkv', content=b'movie' * 1000)
+    unrelated = touch(str(tmp_path), 'unrelated.mkv', content=b'other' * 1000)
+
+    index = IdentityIndex()
+    index.record_access(old)
+
+    # copy + delete gives the file a new inode
+    new = os.path.join(str(tmp_path), 'new.mkv')
+    shutil.copyfile(old, new)
+    os.remove(old)
+
+    assert index.reconcile([old], [unrelated, new]) == [(old, new)]
+
+
+def test_save_load(tmp_path, touch):
+    path = touch(str(tmp_path), 'a.mkv')
+
+    index = IdentityIndex()
+    index.record_access(path)
+    index.save(str(tmp_path / 'index.json'))
+
+    loaded = IdentityIndex.load(str(tmp_path / 'index.json'))
+    assert loaded.get(path).identity == index.get(path).identity
+    assert loaded.get(path).access_count == 1
+
+
+def test_watcher_reports_moves(tmp_path, touch):
+    base = str(tmp_path)
+    old = touch(base, 'a', 'movie.mkv')
+
+    library = Library()
+    watcher = FolderWatcher(library, [base])
+    watcher.scan()
+    library.tag([old], 'favorite')
+    version = library.version
+
+    new = os.path.join(base, 'a', 'renamed.mkv')
+    os.rename(old, new)
+    watcher.poll()
+
+    changes = library.changes_since(version)
+    assert [c[0] for c in changes] == [ADDED, MOVED]
+    assert changes[-1] == (MOVED, 'renamed.mkv', new, old)
+    assert library.query(tags=['favorite']) == [('renamed.mkv', new)]
+
+
+def test_autoplay_rename():
+    auto = PlaylistAutoPlay({'a': 1, 'b': 2, 'c': 3})
+    auto.reset()
+    auto.history = ['a']
+    auto.remains = ['b', 'c', 'd']
+
+    auto.rename('a', 'd')
+
+    assert auto.history == ['d']
+    assert auto.remains == ['b', 'c']
+
+
+def test_open_folder_keeps_same_names(tmp_path, touch):
+    base = str(tmp_path)
+    touch(base, 'a', 'movie.mkv')
+    touch(base, 'b', 'movie.mkv')
+
+    results = queue.Queue()
+    open_folder.action(results, base)
+
+    names = sorted(m[1] for m in results.queue if m[0] == open_folder.RESULT)
+    assert len(names) == 2
+    assert 'movie.mkv' in names
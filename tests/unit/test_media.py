@@ -0,0 +1,48 @@
+from player.media import END, ENDED, ERROR, PAUSED, PLAYING, POSITION, STATE, FakeBackend
+
+
+def record(backend):
+    events = []
+    backend.add_listener(lambda event, value: events.append((event, value)))
+    return events
+
+
+def test_fake_backend_events():
+    backend = FakeBackend(lengths={'a.mkv': 1000})
+    events = record(backend)
+
+    assert backend.open('a.mkv') == 'a.mkv'
+    backend.advance(250)
+    backend.advance(1000)
+
+    assert events == [
+        (STATE, PLAYING),
+        (POSITION, 0.25),
+        (POSITION, 1.0),
+        (STATE, ENDED),
+        (END, None),
+    ]
+    assert backend.get_state() == ENDED
+
+
+def test_paused_backend_is_idle():
+    backend = FakeBackend()
+    backend.open('a.mkv')
+    backend.pause()
+
+    events = record(backend)
+    backend.advance(1000)
+
+    assert events == []
+    assert backend.get_state() == PAUSED and backend.get_time() == 0
+
+
+def test_error_event():
+    backend = FakeBackend()
+    events = record(backend)
+
+    backend.open('a.mkv')
+    backend.fail('broken')
+
+    assert events[-1] == (ERROR, 'broken')
+    assert not backend.is_playing()
@@ -0,0 +1,65 @@
+import json
+import queue
+
+from player.actions import open_folder
+from player.metrics import NULL_SPAN, Histogram, Metrics, metrics
+
+
+def test_disabled_is_noop():
+    m = Metrics()
+
+    assert m.span('a') is NULL_SPAN
+    m.inc('a')
+    m.observe('a', 1)
+
+    @m.timed('f')
+    def f():
+        return 1
+
+    assert f() == 1
+    assert m.stats() == dict(counters={}, histograms={})
+    assert len(m.events) == 0
+
+
+def test_histogram():
+    h = Histogram()
+    for i in range(1, 101):
+        h.observe(i)
+
+    stats = h.to_json()
+    assert stats['count'] == 100 and stats['min'] == 1 and stats['max'] == 100
+    assert 50 <= stats['p50'] <= 64
+    assert stats['p99'] == 100
+
+
+def test_chrome_trace(tmp_path):
+    m = Metrics()
+    m.enable()
+
+    with m.span('outer', file='a.mkv'):
+        with m.span('inner'):
+            pass
+
+    path = str(tmp_path / 'trace.json')
+    m.write_trace(path)
+
+    with open(path) as f:
+        events = json.load(f)['traceEvents']
+
+    assert [e['name'] for e in events] == ['inner', 'outer']
+    assert all(e['ph'] == 'X' for e in events)
+    assert events[1]['args'] == dict(file='a.mkv')
+
+
+def test_actions_are_instrumented(tmp_path):
+    (tmp_path / 'a.mkv').write_bytes(b'')
+
+    metrics.enable()
+    try:
+        open_folder.action(queue.Queue(), str(tmp_path))
+        stats = metrics.stats()
+    finally:
+        metrics.disable()
+
+    assert stats['counters']['open_folder.files'] >= 1
+    assert stats['histograms']['action.open_folder']['count'] >= 1
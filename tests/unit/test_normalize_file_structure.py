@@ -0,0 +1,77 @@
+import os
+import queue
+
+from player.actions.normalize_file_structure import (
+    Executor,
+    action,
+    get_parents,
+    make_plan,
+    scan,
+)
+
+
+def test_get_parents(tmp_path):
+    base = str(tmp_path)
+    assert get_parents(base, os.path.join(base, 'a', 'b', 'c.mkv')) == ['a', 'b']
+    assert get_parents(base, os.path.join(base, 'c.mkv')) == []
+
+
+def test_plan_resolves_collisions(tmp_path, touch):
+    base = str(tmp_path)
+    touch(base, 'show', 'ep.mkv')
+    touch(base, 'show', 's1', 'ep.mkv')
+    touch(base, 'show', 's2', 'ep.mkv')
+
+    plan = make_plan(base, scan(base))
+    moves = [move for batch in plan for move in batch['moves']]
+
+    assert len(plan) == 2
+    assert sorted(os.path.basename(dst) for _, dst in moves) == ['ep (1).mkv', 'ep (2).mkv']
+
+
+def test_action_moves_files(tmp_path, touch):
+    base = str(tmp_path)
+    touch(base, 'show', 's1', 'a.mkv')
+    touch(base, 'show', 's2', 'b.mkv')
+
+    action(queue.Queue(), base)
+
+    assert sorted(os.listdir(os.path.join(base, 'show'))) == ['a.mkv', 'b.mkv']
+
+
+def test_resume_skips_finished_batches(tmp_path, touch):
+    base = str(tmp_path)
+    touch(base, 'show', 's1', 'a.mkv')
+    touch(base, 'show', 's2', 'b.mkv')
+
+    executor = Executor(base)
+    plan = make_plan(base, scan(base))
+
+    # Simulate a run interrupted after the first batch
+    executor.save(plan)
+    executor.execute_batch(plan[0])
+    assert executor.load() == plan
+    assert executor.done() == {plan[0]['id']}
+
+    batches = []
+    executor.run(executor.load(), lambda batch, moved: batches.append(batch['id']))
+
+    assert batches == [plan[1]['id']]
+    assert executor.load() is None
+    assert sorted(os.listdir(os.path.join(base, 'show'))) == ['a.mkv', 'b.mkv']
+
+
+def test_existing_destination_is_not_overwritten(tmp_path, touch):
+    base = str(tmp_path)
+    touch(base, 'show', 's1', 'a.mkv')
+    plan = make_plan(base, scan(base))
+
+    # created after the plan was made
+    existing = touch(base, 'show', 'a.mkv', content=b'existing')
+    Executor(base).run(plan)
+
+    with open(existing, 'rb') as f:
+        assert f.read() == b'existing'
+
+    assert sorted(os.listdir(os.path.join(base, 'show'))) == ['a (1).mkv', 'a.mkv']
+    assert plan[0]['moves'] == [[os.path.join(base, 'show', 's1', 'a.mkv'), os.path.join(base, 'show', 'a (1).mkv')]]
@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('PyQt5')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5 import QtWidgets
+
+from player.daemon import QUERY
+from player.media import ENDED, PLAYING, FakeBackend
+from player.player import Player
+from player.session import Session, write
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+class SlowStart(FakeBackend):
+    """Starts playing when told to, seeks before that are ignored like VLC does"""
+
+    def open(self, path):
+        self.path = path
+        self.time = 0
+        return os.path.basename(path)
+
+    def start(self):
+        self._set_state(PLAYING)
+
+    def set_position(self, position):
+        if self.state == PLAYING:
+            super().set_position(position)
+
+
+def test_restored_position_waits_for_playback(app, tmp_path):
+    backend = SlowStart(default_length=10000)
+    player = Player(backend=backend)
+
+    player.session_file = str(tmp_path / 'session')
+    write(player.session_file, Session(items=[('a.mkv', '/videos/a.mkv')], history=['a.mkv'], position=0.5))
+    player.restore_session()
+
+    assert backend.path == '/videos/a.mkv' and backend.get_time() == 0
+
+    backend.start()
+    assert backend.get_time() == 5000
+
+
+@pytest.fixture
+def player(app):
+    backend = FakeBackend(default_length=1000)
+    player = Player(backend=backend)
+
+    for name in ('a.mkv', 'b.mkv'):
+        player._add_playlist_item(name, f'/videos/{name}')
+
+    player.play_file('/videos/a.mkv')
+    return player
+
+
+def test_position_is_shown(player):
+    player.backend.advance(250)
+    assert player.position.value() == 250
+
+
+def test_next_item_plays_at_the_end(player):
+    play_id = player._play_id
+    player.backend.advance(1000)
+
+    assert player._play_id == play_id + 1
+    assert player.backend.get_state() == PLAYING
+
+    # the timer fallback does not skip the new item
+    player._update_ui()
+    assert player._play_id == play_id + 1
+
+
+def test_missed_end_is_caught_by_the_timer(player):
+    play_id = player._play_id
+    player.backend.state = ENDED
+
+    player._update_ui()
+    assert player._play_id == play_id + 1
+
+
+def test_events_from_the_backend_thread(app, player):
+    play_id = player._play_id
+
+    # VLC calls the listeners from its own thread, they are queued to the UI thread
+    thread = threading.Thread(target=player.backend.advance, args=(1000,))
+    thread.start()
+    thread.join()
+    assert player._play_id == play_id
+
+    app.processEvents()
+    assert player._play_id == play_id + 1
+    assert player.position.value() == 0
+
+
+def open_and_wait(player, folders, timeout=5):
+    player.open_folder(folders)
+
+    start = time.time()
+    while player.scans:
+        assert time.time() - start < timeout
+        player._process_async_work()
+        time.sleep(0.01)
+
+
+def test_open_playlists_and_folders(app, tmp_path, monkeypatch, touch):
+    monkeypatch.setenv('PLAYER_CACHE', str(tmp_path / 'cache'))
+    videos = str(tmp_path / 'videos')
+    scanned = touch(videos, 'pilot.mkv')
+
+    first = tmp_path / 'first.m3u'
+    first.write_text('#EXTINF:-1,pilot.mkv\n/a/pilot.mkv\n#EXTINF:-1,pilot.mkv\n/b/pilot.mkv\n')
+    second = tmp_path / 'second.jsonl'
+    second.write_text('{"path": "/c/other.mkv"}\n')
+
+    player = Player(backend=FakeBackend())
+    open_and_wait(player, [str(first), str(second), videos])
+
+    assert sorted(player.names.values()) == sorted(['/a/pilot.mkv', '/b/pilot.mkv', '/c/other.mkv', scanned])
+    assert player.playlist.count() == 4
+
+    # the import and the scan end once, playback starts once
+    assert player._play_id == 1
+
+
+class DeadLibrary:
+    def query(self, text):
+        raise ConnectionRefusedError('library is down')
+
+    def search(self, text):
+        raise ConnectionRefusedError('library is down')
+
+
+def test_library_queries_do_not_block_the_ui(player):
+    player.library = DeadLibrary()
+    player.search.setText('a.')
+
+    # the answer comes through the queue, an older answer is dropped
+    player._process_result(QUERY, 'b', [('b.mkv', '/videos/b.mkv')], None)
+    player._process_result(QUERY, 'a.', [('b.mkv', '/videos/b.mkv')], None)
+    assert [item.isHidden() for item in player.playlist_items] == [True, False]
+
+    # the service is down, the playlist is filtered locally
+    start = time.time()
+    while player._process_async_work() is not True:
+        assert time.time() - start < 5
+
+    assert [item.isHidden() for item in player.playlist_items] == [False, True]
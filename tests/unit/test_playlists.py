@@ -0,0 +1,105 @@
+import json
+import os
+
+import pytest
+
+import player.playlists as playlists
+from player.actions import export_playlist, import_playlist, open_folder
+
+
+class Queue(list):
+    put = list.append
+
+
+def test_m3u_roundtrip(tmp_path):
+    entries = [(f'Video {i}', str(tmp_path / f'v{i}.mp4')) for i in range(25)]
+    file = str(tmp_path / 'list.m3u8')
+
+    assert playlists.write(file, iter(entries)) == 25
+
+    batches = list(playlists.read(file, batch_size=10))
+    assert [len(b) for b in batches] == [10, 10, 5]
+    assert [e for b in batches for e in b] == entries
+
+
+def test_m3u_relative_paths_and_plain_lines(tmp_path):
+    file = tmp_path / 'list.m3u'
+    file.write_text('#EXTM3U\n\nsub/a.mkv\n#EXTINF:12,Named\n/abs/b.mkv\nhttp://host/c.mkv\n')
+
+    entries = next(playlists.read(str(file)))
+    assert entries == [
+        ('a.mkv', os.path.join(str(tmp_path), 'sub', 'a.mkv')),
+        ('Named', '/abs/b.mkv'),
+        ('c.mkv', 'http://host/c.mkv'),
+    ]
+
+
+def test_jsonl_roundtrip(tmp_path):
+    file = str(tmp_path / 'list.jsonl')
+    playlists.write(file, [('a', '/x/a.mp4'), ('b', '/x/b.mp4')])
+
+    with open(file) as f:
+        assert json.loads(f.readline()) == dict(name='a', path='/x/a.mp4')
+
+    assert next(playlists.read(file)) == [('a', '/x/a.mp4'), ('b', '/x/b.mp4')]
+
+
+def test_import_action_sends_batches(tmp_path):
+    file = str(tmp_path / 'list.jsonl')
+    playlists.write(file, ((f'{i}', f'/x/{i}.mp4') for i in range(5)))
+
+    queue = Queue()
+    import_playlist.action(queue, file, batch_size=2)
+
+    assert queue[0] == (open_folder.START,)
+    assert [len(m[1]) for m in queue[1:-1]] == [2, 2, 1]
+    assert queue[-1] == (open_folder.END,)
+
+
+def test_import_same_names(tmp_path):
+    first = tmp_path / 'first.m3u'
+    first.write_text('#EXTM3U\n#EXTINF:-1,Pilot\n/a/pilot.mkv\n#EXTINF:-1,Pilot\n/b/pilot.mkv\n')
+    second = tmp_path / 'second.m3u'
+    second.write_text('/c/Pilot\n/a/pilot.mkv\n')
+
+    queue = Queue()
+    import_playlist.action(queue, [str(first), str(second)])
+
+    assert [m[0] for m in queue] == [open_folder.START, open_folder.BATCH, open_folder.BATCH, open_folder.END]
+    assert [e for m in queue[1:-1] for e in m[1]] == [
+        ('Pilot', '/a/pilot.mkv'),
+        ('/b/pilot.mkv', '/b/pilot.mkv'),
+        ('/c/Pilot', '/c/Pilot'),
+        ('Pilot', '/a/pilot.mkv'),
+    ]
+
+
+def test_export_action_scans_folder(tmp_path):
+    videos = tmp_path / 'videos'
+    videos.mkdir()
+    for name in ('a.mp4', 'b.mkv', 'notes.txt'):
+        (videos / name).write_bytes(b'x')
+
+    output = str(tmp_path / 'list.m3u8')
+    queue = Queue()
+    export_playlist.action(queue, str(videos), output)
+
+    assert queue == [(export_playlist.RESULT, output, 2)]
+    names = sorted(name for batch in playlists.read(output) for name, _ in batch)
+    assert names == ['a.mp4', 'b.mkv']
+
+
+def test_export_action_raises_scan_errors(tmp_path, monkeypatch):
+    def scan(queue, *args):
+        queue.put((open_folder.RESULT, 'a.mp4', '/videos/a.mp4'))
+        raise OSError('disk went away')
+
+    monkeypatch.setattr(open_folder, '_scan', scan)
+
+    output = str(tmp_path / 'list.m3u8')
+    queue = Queue()
+    with pytest.raises(OSError):
+        export_playlist.action(queue, str(tmp_path), output)
+
+    assert queue == []
+    assert [name for batch in playlists.read(output) for name, _ in batch] == ['a.mp4']
@@ -0,0 +1,67 @@
+from player.library import Library
+from player.search import SearchIndex, parse_query
+
+
+def names(results):
+    return [name for name, _ in results]
+
+
+def test_parse_query():
+    assert parse_query('') == ''
+    assert parse_query('1968.mkv -x') == '"1968.mkv"* "-x"*'
+    assert parse_query('"open phrase') == '"open phrase"'
+    assert parse_query('title:"the end"') == 'title : "the end"'
+
+
+def test_name_matches_rank_first():
+    index = SearchIndex()
+    index.add('holiday.mkv', '/videos/summer/holiday.mkv')
+    index.add('beach.mkv', '/videos/summer/beach.mkv')
+    index.add('summer of 69.mkv', '/videos/music/summer of 69.mkv')
+
+    first, *others = names(index.query('summ'))
+    assert first == 'summer of 69.mkv'
+    assert sorted(others) == ['beach.mkv', 'holiday.mkv']
+    assert names(index.query('summ', limit=1)) == ['summer of 69.mkv']
+    assert index.query('winter') == []
+
+
+def test_incremental_updates():
+    index = SearchIndex(batch_size=2)
+    index.add('a.mkv', '/videos/a.mkv')
+    index.add('b.mkv', '/videos/b.mkv')
+    index.add('a.mkv', '/videos/a.mkv')
+
+    assert len(index) == 2
+
+    index.set_title('/videos/a.mkv', 'The Big Lebowski')
+    assert names(index.query('"big lebowski"')) == ['a.mkv']
+
+    index.tag(['/videos/a.mkv', '/videos/b.mkv'], 'comedy')
+    index.untag(['/videos/b.mkv'], 'comedy')
+    assert index.tags('/videos/a.mkv') == ['comedy']
+    assert names(index.query('tags:comedy')) == ['a.mkv']
+
+    # moved files keep their title and tags
+    index.add('c.mkv', '/other/c.mkv')
+    index.move('/videos/a.mkv', '/other/c.mkv', 'c.mkv')
+    assert index.query('lebowski') == [('c.mkv', '/other/c.mkv')]
+    assert names(index.query('folders:other')) == ['c.mkv']
+    assert len(index) == 2
+
+    index.remove('/other/c.mkv')
+    assert index.query('lebowski') == []
+    assert len(index) == 1
+
+
+def test_library_search_follows_changes():
+    library = Library()
+    library.add('first.mkv', '/videos/first.mkv')
+    library.add('second.mkv', '/videos/second.mkv')
+    library.tag(['/videos/second.mkv', '/videos/missing.mkv'], 'favorite')
+
+    assert library.search('favorite') == [('second.mkv', '/videos/second.mkv')]
+
+    library.remove('/videos/second.mkv')
+    assert library.search('favorite') == []
+    assert names(library.search('first')) == ['first.mkv']
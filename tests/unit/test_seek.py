@@ -0,0 +1,126 @@
+from player.media import POSITION, FakeBackend
+from player.seek import KeyframeIndex, SeekScheduler
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_is_coalesced():
+    backend = FakeBackend(seek_cost=30)
+    backend.open('a.mkv')
+    clock = Clock()
+    seeks = SeekScheduler(backend, min_interval=0.1, clock=clock)
+
+    # Holding the arrow key for a second, one key event every 20ms
+    for i in range(50):
+        clock.now = i * 0.02
+        seeks.seek_by(500)
+        seeks.flush()
+
+    clock.now += 0.1
+    seeks.flush()
+
+    assert backend.get_time() == 25000
+    assert backend.seeks <= 11
+    assert seeks.delay() is None
+
+
+def test_seek_is_clamped():
+    backend = FakeBackend(default_length=1000)
+    backend.open('a.mkv')
+    seeks = SeekScheduler(backend, min_interval=0)
+
+    assert seeks.seek_by(-500) == 0
+    assert seeks.seek_by(5000) == 1000
+
+
+def test_keyframe_index():
+    index = KeyframeIndex([0, 2000, 4000])
+    index.add(2000)
+
+    assert len(index) == 3
+    assert index.before(3999) == 2000
+    assert index.snap(4500, window=1000) == 4000
+    assert index.snap(3500, window=1000) == 3500
+
+
+def test_coarse_seeks_snap_to_known_keyframes():
+    backend = FakeBackend(keyframe_interval=2000, frame_cost=1)
+    backend.open('a.mkv')
+    seeks = SeekScheduler(backend, min_interval=0)
+    seeks.open('a.mkv')
+
+    seeks.seek_by(10500)
+    assert backend.get_time() == 10000
+    assert backend.seek_time == 0
+
+    # small seeks are exact
+    seeks.seek_by(700)
+    assert backend.get_time() == 10700
+
+
+def test_small_steps_move_forward_between_keyframes():
+    backend = FakeBackend(keyframe_interval=10000)
+    backend.open('a.mkv')
+    seeks = SeekScheduler(backend, min_interval=0)
+    seeks.open('a.mkv')
+
+    for _ in range(4):
+        seeks.seek_by(500)
+
+    assert backend.get_time() == 2000
+
+
+def test_keyframes_are_learned_from_landings():
+    backend = FakeBackend(keyframe_interval=2000)
+    backend.get_keyframes = lambda: None
+    backend.open('a.mkv')
+    seeks = SeekScheduler(backend, min_interval=0)
+    seeks.open('a.mkv')
+
+    seeks.seek_to(7000, coarse=True)
+    assert backend.get_time() == 6000
+    assert seeks.index.times == [6000]
+
+    # the index is kept per file
+    seeks.open('b.mkv')
+    assert len(seeks.index) == 0
+    seeks.open('a.mkv')
+    assert seeks.index.times == [6000]
+
+
+def test_small_seeks_do_not_teach_keyframes():
+    backend = FakeBackend(keyframe_interval=2000)
+    backend.get_keyframes = lambda: None
+    backend.open('a.mkv')
+    seeks = SeekScheduler(backend, min_interval=0)
+    seeks.open('a.mkv')
+
+    seeks.seek_to(7000)
+    assert backend.get_time() == 7000
+    assert len(seeks.index) == 0
+
+
+def test_positions_before_the_seek_are_ignored():
+    backend = FakeBackend(keyframe_interval=2000)
+    backend.get_keyframes = lambda: None
+    backend.open('a.mkv')
+    backend.advance(3000)
+    seeks = SeekScheduler(backend, min_interval=0)
+    seeks.open('a.mkv')
+
+    # the backend reports the playback position before the seek lands
+    set_time = backend.set_time
+
+    def late_set_time(time, fast=False):
+        backend.notify(POSITION, backend.get_position())
+        set_time(time, fast)
+
+    backend.set_time = late_set_time
+    seeks.seek_to(9000, coarse=True)
+    assert seeks.index.times == [8000]
@@ -0,0 +1,59 @@
+import random
+
+from player.random_play import PlaylistAutoPlay
+from player.session import Session, Snapshot, load, write
+
+
+def make_autoplay(count):
+    names = {f'{i}.mkv': f'/videos/{i}.mkv' for i in range(count)}
+    auto = PlaylistAutoPlay(names)
+    auto.reset()
+    return names, auto
+
+
+def test_round_trip(tmp_path):
+    random.seed(0)
+    names, auto = make_autoplay(100)
+    auto.set_selection_set([n for n in names if n.startswith('1')])
+
+    for _ in range(5):
+        auto.next()
+    auto.previous()
+
+    path = str(tmp_path / 'session.bin')
+    items = sorted(names.items())
+    write(path, Session.capture(auto, items, filter='1', position=0.25, roots=['/videos']))
+
+    session = load(path)
+    assert session.items == items
+    assert session.filter == '1'
+    assert session.roots == ['/videos']
+    assert session.position == 0.25
+
+    restored = PlaylistAutoPlay(dict(session.items))
+    session.restore(restored)
+
+    assert restored.history == auto.history
+    assert restored.remains == auto.remains
+    assert restored.next_items == auto.next_items
+    assert restored.selected == auto.selected
+    assert restored.next() == auto.next()
+
+
+def test_snapshot_is_lazy(tmp_path):
+    path = str(tmp_path / 'session.bin')
+    write(path, Session(items=[('é.mkv', '/vidéos/é.mkv'), ('b.mkv', '/b.mkv')]))
+
+    with Snapshot(path) as snapshot:
+        assert len(snapshot) == 2
+        assert snapshot.name(0) == 'é.mkv'
+        assert snapshot.path(1) == '/b.mkv'
+        assert snapshot.session().selected is None
+
+
+def test_invalid_snapshot(tmp_path):
+    path = tmp_path / 'session.bin'
+    path.write_bytes(b'garbage' * 20)
+
+    assert load(str(path)) is None
+    assert load(str(tmp_path / 'missing.bin')) is None
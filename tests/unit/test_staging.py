@@ -0,0 +1,77 @@
+import os
+import queue
+
+from player.staging import RESTORED, STAGED, StagingArea, StagingWorker
+
+
+def test_stage_keeps_relative_path(tmp_path, touch):
+    base = str(tmp_path)
+    a = touch(os.path.join(base, 'x', 'video.mkv'))
+    b = touch(os.path.join(base, 'y', 'video.mkv'))
+
+    area = StagingArea(base)
+    batch, moves = area.stage([a, b])
+
+    assert len(moves) == 2
+    assert os.path.exists(os.path.join(base, 'deleted', 'x', 'video.mkv'))
+    assert os.path.exists(os.path.join(base, 'deleted', 'y', 'video.mkv'))
+    assert not os.path.exists(a) and not os.path.exists(b)
+    assert list(area.batches()) == [batch]
+
+
+def test_undo_last_batch(tmp_path, touch):
+    base = str(tmp_path)
+    a = touch(os.path.join(base, 'a.mkv'))
+    b = touch(os.path.join(base, 'b.mkv'))
+
+    area = StagingArea(base)
+    area.stage([a])
+    area.stage([b])
+
+    assert area.undo() == [os.path.abspath(b)]
+    assert os.path.exists(b) and not os.path.exists(a)
+
+    assert area.undo(all=True) == [os.path.abspath(a)]
+    assert area.batches() == {}
+
+
+def test_same_path_staged_twice(tmp_path, touch):
+    base = str(tmp_path)
+    area = StagingArea(base)
+
+    area.stage([touch(base, 'a.mkv', content=b'1')])
+    area.stage([touch(base, 'a.mkv', content=b'2')])
+
+    assert sorted(os.listdir(area.folder)) == ['a.mkv', 'a.mkv.1', 'journal.jsonl']
+
+
+def test_purge(tmp_path, touch):
+    base = str(tmp_path)
+    area = StagingArea(base)
+    area.stage([touch(os.path.join(base, 'a.mkv'))])
+
+    assert len(area.purge(all=True)) == 1
+    assert os.listdir(area.folder) == ['journal.jsonl']
+    assert area.undo() == []
+
+
+def test_worker_batches_deletes(tmp_path, touch):
+    base = str(tmp_path)
+    paths = [touch(os.path.join(base, f'{i}.mkv')) for i in range(50)]
+
+    results = queue.Queue()
+    worker = StagingWorker(results)
+    batches = [worker.delete(base, [path]) for path in paths]
+    worker.start()
+
+    # the deletes waiting for the worker share one journal write but stay separate batches
+    worker.undo(base, batches[10])
+    worker.stop()
+
+    messages = list(results.queue)
+    assert [m[1] for m in messages[:-1]] == batches
+    assert all(m[0] == STAGED and len(m[2]) == 1 for m in messages[:-1])
+    assert messages[-1] == (RESTORED, batches[10], [paths[10]])
+
+    area = StagingArea(base)
+    assert len(area.batches()) == 49 and batches[10] not in area.batches()
@@ -0,0 +1,132 @@
+import os
+import queue
+
+from player.thumbnails import (
+    ERROR,
+    RESULT,
+    FrameSource,
+    MemoryLRU,
+    ThumbnailCache,
+    ThumbnailGenerator,
+)
+
+
+class FakeFrameSource(FrameSource):
+    def __init__(self):
+        self.calls = 0
+
+    def extract(self, path, positions, width):
+        self.calls += 1
+        return [f'{path}:{pos:.2f}'.encode() * 10 for pos in positions]
+
+
+def test_memory_lru():
+    lru = MemoryLRU(2)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    lru.get('a')
+    lru.put('c', 3)
+
+    assert 'a' in lru and 'c' in lru
+    assert 'b' not in lru
+
+
+def test_cache_is_content_addressed(tmp_path, touch):
+    cache = ThumbnailCache(str(tmp_path / 'cache'))
+    a = touch(str(tmp_path), 'a.mkv', content=b'video' * 100)
+    b = touch(str(tmp_path), 'b.mkv', content=b'video' * 100)
+
+    assert cache.key(a) == cache.key(b)
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ThumbnailCache(str(tmp_path), max_bytes=250)
+
+    cache.put('aa', 0, b'x' * 100)
+    cache.put('bb', 0, b'x' * 100)
+    assert cache.get('aa', 0) is not None
+
+    cache.put('cc', 0, b'x' * 100)
+
+    assert cache.get('aa', 0) is not None
+    assert cache.get('bb', 0) is None
+    assert cache.size == 200
+
+    # LRU order survives a restart
+    reloaded = ThumbnailCache(str(tmp_path), max_bytes=250)
+    assert reloaded.size == 200
+
+
+def test_generator_uses_cache(tmp_path, touch):
+    results = queue.Queue()
+    source = FakeFrameSource()
+    cache = ThumbnailCache(str(tmp_path / 'cache'))
+    generator = ThumbnailGenerator(results, cache=cache, source=source, frames=3)
+
+    video = touch(str(tmp_path), 'a.mkv', content=b'video')
+    frames = generator.generate(video)
+    assert len(frames) == 3 and all(os.path.exists(f) for f in frames)
+
+    assert generator.generate(video) == frames
+    assert source.calls == 1
+
+
+def test_generator_background(tmp_path, touch):
+    results = queue.Queue()
+    cache = ThumbnailCache(str(tmp_path / 'cache'))
+    generator = ThumbnailGenerator(results, cache=cache, source=FakeFrameSource())
+    generator.start()
+
+    video = touch(str(tmp_path), 'a.mkv', content=b'video')
+    generator.request(video)
+
+    action, path, frames = results.get(timeout=5)
+    generator.stop()
+
+    assert action == RESULT and path == video and len(frames) == 1
+
+
+def test_generator_does_not_retry_failures(tmp_path, touch):
+    class BrokenSource(FrameSource):
+        calls = 0
+
+        def extract(self, path, positions, width):
+            self.calls += 1
+            raise RuntimeError('cannot decode')
+
+    results = queue.Queue()
+    source = BrokenSource()
+    generator = ThumbnailGenerator(results, cache=ThumbnailCache(str(tmp_path / 'cache')), source=source)
+    generator.start()
+
+    video = touch(str(tmp_path), 'a.mkv', content=b'video')
+    generator.request(video)
+    assert results.get(timeout=5) == (ERROR, video, 'cannot decode')
+
+    generator.request(video)
+    generator.stop()
+
+    assert source.calls == 1 and results.empty()
+
+
+def test_missing_frames_are_a_failure(tmp_path, touch):
+    class EmptySource(FrameSource):
+        calls = 0
+
+        def extract(self, path, positions, width):
+            self.calls += 1
+            return []
+
+    results = queue.Queue()
+    source = EmptySource()
+    generator = ThumbnailGenerator(results, cache=ThumbnailCache(str(tmp_path / 'cache')), source=source, frames=3)
+    generator.start()
+
+    video = touch(str(tmp_path), 'a.mkv', content=b'video')
+    generator.request(video)
+    assert results.get(timeout=5) == (ERROR, video, '0 of 3 frames extracted')
+
+    generator.request(video)
+    generator.stop()
+
+    assert source.calls == 1 and results.empty()
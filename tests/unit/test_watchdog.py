@@ -0,0 +1,83 @@
+import threading
+import time
+
+from player.watchdog import StallWatchdog, collapse
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(cond, timeout=5):
+    start = time.time()
+    while not cond():
+        assert time.time() - start < timeout
+        time.sleep(0.01)
+
+
+def test_collapse_outermost_first():
+    def inner():
+        import sys
+        return collapse(sys._getframe())
+
+    stack = inner().split(';')
+    assert stack[-1].startswith('inner (test_watchdog.py:')
+    assert stack[-2].startswith('test_collapse_outermost_first')
+
+
+def test_stall_is_sampled(tmp_path):
+    report = str(tmp_path / 'stalls.txt')
+    clock = Clock()
+    started = threading.Event()
+    release = threading.Event()
+    ident = []
+
+    def slow_sort():
+        release.wait()
+
+    def ui():
+        ident.append(threading.get_ident())
+        started.set()
+        slow_sort()
+        watchdog.heartbeat()
+
+    watchdog = StallWatchdog(report, threshold=0.05, interval=0.01, clock=clock)
+    thread = threading.Thread(target=ui)
+    thread.start()
+    started.wait()
+    watchdog.thread_id = ident[0]
+    watchdog.start()
+
+    # the UI thread missed its heartbeat, keep it stalled until enough samples are taken
+    clock.now = 1
+    wait_for(lambda: sum(watchdog.samples.values()) > 5)
+    release.set()
+    thread.join()
+
+    wait_for(lambda: watchdog.stalls == 1)
+    watchdog.stop()
+
+    with open(report) as f:
+        lines = f.read().splitlines()
+
+    assert lines
+    stack, count = lines[0].rsplit(' ', 1)
+    assert 'slow_sort' in stack and int(count) > 5
+
+
+def test_no_stall_no_report(tmp_path):
+    report = tmp_path / 'stalls.txt'
+    clock = Clock()
+    watchdog = StallWatchdog(str(report), threshold=0.05, interval=0.01, clock=clock).start()
+
+    for _ in range(10):
+        watchdog.heartbeat(0.01)
+        clock.now += 0.01
+        time.sleep(0.01)
+
+    watchdog.stop()
+    assert watchdog.stalls == 0 and not report.exists()